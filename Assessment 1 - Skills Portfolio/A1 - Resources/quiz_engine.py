@@ -0,0 +1,134 @@
+"""Maths Quiz rules without the window (no tkinter in here).
+
+QuizSession holds everything one play of the quiz needs: its problems,
+the question on show, the attempts used and the score. Excersize 1 drives
+one per play from its widgets; quiz_server.py keeps thousands of them
+side by side, one per student.
+
+    session = QuizSession("easy")
+    session.problem          # Problem(num1, op, num2, answer)
+    session.answer(12)       # -> Outcome("correct", 10, None, False)
+    session.rank()           # once session.finished
+
+Scoring is the same as ever: 10 points for a right answer at the first
+attempt, 5 at the second, nothing after two wrong answers. The time
+spent on each question is kept for quiz_results.py.
+"""
+import time
+from collections import namedtuple
+
+from quiz_problems import LEVELS, QUESTIONS, generate
+
+POINTS = (10, 5)  # points for a right answer at the 1st, 2nd attempt
+ATTEMPTS = len(POINTS)
+RANKS = ((90, "A+"), (80, "A"), (70, "B"), (60, "C"))
+LOWEST_RANK = "Needs Improvement"
+
+# result is "correct", "retry" (wrong, try again) or "wrong" (no tries
+# left); correct_answer is only given once it can no longer be tried
+Outcome = namedtuple("Outcome", "result points correct_answer finished")
+
+
+def isCorrect(user_answer, correct_answer):
+    """Check if user's answer is correct"""
+    return user_answer == correct_answer
+
+
+def rank_for(score):
+    """Rank for a score out of 100"""
+    for lowest, rank in RANKS:
+        if score >= lowest:
+            return rank
+    return LOWEST_RANK
+
+
+class QuizSession:
+    """One play of the quiz at one difficulty level."""
+
+    __slots__ = ("level", "problems", "current", "attempts", "score", "points",
+                 "seconds", "_asked")
+
+    def __init__(self, level, seed=None, questions=QUESTIONS):
+        if level not in LEVELS:
+            raise ValueError(f"unknown level {level!r}")
+        self.level = level
+        self.problems = generate(level, questions, seed)
+        self.current = 0  # index of the question on show
+        self.attempts = 0  # wrong answers to it so far
+        self.score = 0
+        self.points = []  # points scored per finished question
+        self.seconds = []  # time taken per finished question
+        self._asked = time.monotonic()
+
+    @property
+    def seed(self):
+        return self.problems.seed
+
+    @property
+    def questions(self):
+        return len(self.problems)
+
+    @property
+    def number(self):
+        """1-based number of the question on show"""
+        return self.current + 1
+
+    @property
+    def finished(self):
+        return self.current >= len(self.problems)
+
+    @property
+    def problem(self):
+        """The Problem on show, or None once the quiz is finished"""
+        return None if self.finished else self.problems[self.current]
+
+    @property
+    def max_score(self):
+        return POINTS[0] * len(self.problems)
+
+    def shown(self):
+        """Restart the clock for the question on show, e.g. once a window
+        has actually drawn it."""
+        self._asked = time.monotonic()
+
+    def answer(self, user_answer):
+        """Mark ``user_answer`` to the question on show; returns an Outcome."""
+        if self.finished:
+            raise ValueError("the quiz is already finished")
+        correct_answer = self.problems.answers[self.current]
+        if isCorrect(user_answer, correct_answer):
+            points = POINTS[self.attempts]
+            self.score += points
+            self._next(points)
+            return Outcome("correct", points, None, self.finished)
+        self.attempts += 1
+        if self.attempts < ATTEMPTS:
+            return Outcome("retry", 0, None, False)
+        self._next(0)
+        return Outcome("wrong", 0, correct_answer, self.finished)
+
+    def _next(self, points):
+        now = time.monotonic()
+        self.points.append(points)
+        self.seconds.append(now - self._asked)
+        self._asked = now
+        self.current += 1
+        self.attempts = 0
+
+    def rank(self):
+        """Rank for the score, scaled to 100 for quizzes of other lengths"""
+        return rank_for(self.score * 100 // self.max_score if self.max_score else 0)
+
+    def state(self):
+        """JSON-friendly view for front ends; never includes the answer
+        to the question on show, nor the seed that would give them all."""
+        state = {"level": self.level, "question": self.number,
+                 "questions": len(self.problems), "score": self.score,
+                 "max_score": self.max_score, "finished": self.finished}
+        problem = self.problem
+        if problem is None:
+            state["rank"] = self.rank()
+        else:
+            state["problem"] = f"{problem.num1} {problem.op} {problem.num2}"
+            state["attempts_left"] = ATTEMPTS - self.attempts
+        return state
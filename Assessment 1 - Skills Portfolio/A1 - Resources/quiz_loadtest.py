@@ -0,0 +1,167 @@
+"""Load test for quiz_server.py with thousands of quizzes in progress.
+
+    python quiz_loadtest.py --spawn                        # starts its own server
+    python quiz_loadtest.py --port 8081 --clients 50 --quizzes 100
+
+Each simulated client opens one keep-alive connection and starts
+``--quizzes`` quizzes on it, so clients x quizzes are in progress at the
+same time. It then answers them round-robin, one question per quiz in
+turn, getting the first attempt wrong ``--wrong`` of the time. Every
+final score is checked against the score those answers should earn.
+Prints requests/sec and latency percentiles as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+LEVELS = ("easy", "moderate", "advanced")
+
+
+async def call(reader, writer, method, path, body, latencies):
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    request = (f"{method} {path} HTTP/1.1\r\nHost: quiz\r\n"
+               f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n")
+    start = time.perf_counter()
+    writer.write(request.encode("latin-1") + payload)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    for line in head.decode("latin-1").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    data = json.loads(await reader.readexactly(length))
+    latencies.append(time.perf_counter() - start)
+    return status, data
+
+
+def solve(problem):
+    num1, op, num2 = problem.split()
+    return int(num1) + int(num2) if op == "+" else int(num1) - int(num2)
+
+
+async def client(host, port, quizzes, wrong, seed, latencies, report):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        states = {}
+        expected = {}
+        for n in range(quizzes):
+            status, state = await call(reader, writer, "POST", "/quiz",
+                                       {"level": LEVELS[n % len(LEVELS)]}, latencies)
+            if status != 201:
+                report["errors"][status] = report["errors"].get(status, 0) + 1
+                continue
+            states[state["id"]] = state
+            expected[state["id"]] = 0
+        report["peak_quizzes"] += len(states)
+        while states:
+            for token, state in list(states.items()):
+                answer = solve(state["problem"])
+                path = f"/quiz/{token}/answer"
+                points = 10
+                if rng.random() < wrong:
+                    status, state = await call(reader, writer, "POST", path,
+                                               {"answer": answer + 1}, latencies)
+                    points = 5
+                status, state = await call(reader, writer, "POST", path,
+                                           {"answer": answer}, latencies)
+                if status != 200:
+                    report["errors"][status] = report["errors"].get(status, 0) + 1
+                    del states[token]
+                    continue
+                expected[token] += points
+                if state["finished"]:
+                    del states[token]
+                    report["finished"] += 1
+                    if state["score"] != expected[token]:
+                        report["wrong_scores"] += 1
+                else:
+                    states[token] = state
+    finally:
+        writer.close()
+
+
+def _percentile(values, p):
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+async def run(host, port, clients, quizzes, wrong, seed):
+    latencies = []
+    report = {"errors": {}, "peak_quizzes": 0, "finished": 0, "wrong_scores": 0}
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(host, port, quizzes, wrong, seed + n,
+                                            latencies, report)
+                                     for n in range(clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failed = [repr(r) for r in results if isinstance(r, Exception)]
+    latencies.sort()
+    report = {"clients": clients, "quizzes_in_progress": report["peak_quizzes"],
+              "quizzes_finished": report["finished"], "wrong_scores": report["wrong_scores"],
+              "requests": len(latencies), "seconds": round(elapsed, 3),
+              "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+              "errors": report["errors"], "failed_clients": failed[:5]}
+    if latencies:
+        report["latency_ms"] = {f"p{p}": round(_percentile(latencies, p) * 1e3, 3)
+                                for p in (50, 90, 99)}
+        report["latency_ms"]["max"] = round(latencies[-1] * 1e3, 3)
+    return report
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port, results=None):
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(here, "quiz_server.py"), "--port", str(port)]
+    if results:
+        command += ["--results", results]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()  # "Serving ..." once it is listening
+    return proc
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test quiz_server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--quizzes", type=int, default=40, help="quizzes in progress per client")
+    parser.add_argument("--wrong", type=float, default=0.2,
+                        help="share of questions first answered wrongly")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a server on a free port for the test")
+    parser.add_argument("--results", help="with --spawn, have the server keep results here")
+    args = parser.parse_args(argv)
+
+    proc = None
+    if args.spawn:
+        args.port = _free_port()
+        proc = spawn_server(args.port, args.results)
+    try:
+        report = asyncio.run(run(args.host, args.port, args.clients, args.quizzes,
+                                 args.wrong, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps(report, indent=2))
+    bad = report["errors"] or report["failed_clients"] or report["wrong_scores"]
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Seeded, batch generation of Maths Quiz problems and worksheets.
+
+A ProblemSet holds any number of problems as columns (first number,
+second number, operation, answer), generated together from one seed:
+
+    problems = generate("moderate", count=10 * 1000, seed=42)
+    problems.quiz(3)          # the 10 problems of quiz 3
+    problems[0].answer        # precomputed, no eval needed
+
+The same level and seed always give the same problems, and a longer
+batch starts with the problems of a shorter one, so any single quiz of a
+printed or online worksheet can be regenerated from (level, seed, quiz
+number). The stdlib generator is used rather than NumPy so the sequence
+does not depend on what is installed.
+
+Run as a script to export worksheets (the quiz window imports only what
+generate() needs):
+
+    python quiz_problems.py --level easy --quizzes 500 --seed 7 -o sheets.txt
+"""
+import random
+import sys
+from array import array
+from collections import namedtuple
+
+# Operand range per difficulty level (inclusive)
+LEVELS = {"easy": (1, 9), "moderate": (10, 99), "advanced": (1000, 9999)}
+OPERATIONS = ("+", "-")
+QUESTIONS = 10  # problems per quiz
+
+Problem = namedtuple("Problem", "num1 op num2 answer")
+
+
+class ProblemSet:
+    """``count`` problems for one level, stored column-wise."""
+
+    def __init__(self, level, seed, num1, num2, ops, answers):
+        self.level = level
+        self.seed = seed
+        self.num1 = num1
+        self.num2 = num2
+        self.ops = ops  # index into OPERATIONS per problem
+        self.answers = answers
+
+    def __len__(self):
+        return len(self.answers)
+
+    def __getitem__(self, i):
+        return Problem(self.num1[i], OPERATIONS[self.ops[i]], self.num2[i], self.answers[i])
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+    def quiz(self, number, size=QUESTIONS):
+        """The problems of quiz ``number`` (0-based) as a list."""
+        start = number * size
+        return [self[i] for i in range(start, min(start + size, len(self)))]
+
+    def quizzes(self, size=QUESTIONS):
+        return (len(self) + size - 1) // size
+
+
+def generate(level, count=QUESTIONS, seed=None):
+    """Generate ``count`` problems for ``level`` in one batch.
+
+    Each problem takes three 32-bit words from a single randbytes() call
+    (first number, second number, operation), so no per-question calls
+    into the random module are made. The modulo bias for these ranges is
+    below one in 400,000.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"unknown level {level!r}")
+    if seed is None:
+        seed = random.SystemRandom().randrange(1 << 32)
+    low, high = LEVELS[level]
+    span = high - low + 1
+    words = array("I")
+    words.frombytes(random.Random(seed).randbytes(12 * count))
+    if sys.byteorder == "big":
+        words.byteswap()  # same problems on every platform
+    num1 = array("l", [low + w % span for w in words[0::3]])
+    num2 = array("l", [low + w % span for w in words[1::3]])
+    ops = bytes(w & 1 for w in words[2::3])
+    answers = array("l", [a - b if o else a + b for a, b, o in zip(num1, num2, ops)])
+    return ProblemSet(level, seed, num1, num2, ops, answers)
+
+
+# ----------------------- WORKSHEETS -----------------------
+
+def write_text(problems, out, answers=True, size=QUESTIONS):
+    """Printable worksheets, one block per quiz, answer key at the end."""
+    for q in range(problems.quizzes(size)):
+        out.write(f"Maths Quiz - {problems.level} - seed {problems.seed} - quiz {q + 1}\n\n")
+        for n, p in enumerate(problems.quiz(q, size), 1):
+            out.write(f"{n:>2}. {p.num1} {p.op} {p.num2} = ________\n")
+        out.write("\f\n")
+    if answers:
+        out.write("Answer key\n\n")
+        for q in range(problems.quizzes(size)):
+            key = ", ".join(str(p.answer) for p in problems.quiz(q, size))
+            out.write(f"Quiz {q + 1}: {key}\n")
+
+
+def write_csv(problems, out, answers=True, size=QUESTIONS):
+    """One row per problem, for importing into online quiz tools."""
+    import csv
+
+    writer = csv.writer(out, lineterminator="\n")
+    header = ["quiz", "question", "num1", "op", "num2"]
+    writer.writerow(header + ["answer"] if answers else header)
+    for i, p in enumerate(problems):
+        row = [i // size + 1, i % size + 1, p.num1, p.op, p.num2]
+        writer.writerow(row + [p.answer] if answers else row)
+
+
+def write_json(problems, out, answers=True, size=QUESTIONS):
+    """One JSON object per quiz per line."""
+    import json
+
+    for q in range(problems.quizzes(size)):
+        items = []
+        for p in problems.quiz(q, size):
+            item = {"num1": p.num1, "op": p.op, "num2": p.num2}
+            if answers:
+                item["answer"] = p.answer
+            items.append(item)
+        out.write(json.dumps({"level": problems.level, "seed": problems.seed,
+                              "quiz": q + 1, "problems": items}) + "\n")
+
+
+WRITERS = {"txt": write_text, "csv": write_csv, "json": write_json}
+
+
+def main(argv=None):
+    # Only the command line needs these; the quiz window imports this module
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate Maths Quiz worksheets.")
+    parser.add_argument("--level", choices=LEVELS, default="easy")
+    parser.add_argument("--quizzes", type=int, default=1)
+    parser.add_argument("--seed", type=int, help="reuse to regenerate the same sheets")
+    parser.add_argument("--format", choices=WRITERS, default="txt")
+    parser.add_argument("--no-answers", action="store_true", help="leave out the answers")
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    problems = generate(args.level, args.quizzes * QUESTIONS, args.seed)
+    write = WRITERS[args.format]
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as out:
+            write(problems, out, not args.no_answers)
+        print(f"Wrote {args.quizzes} quiz(zes), seed {problems.seed}, to {args.output}",
+              file=sys.stderr)
+    else:
+        write(problems, sys.stdout, not args.no_answers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,473 @@
+"""Results of finished quizzes: history, leaderboards and analytics.
+
+ResultsStore keeps these files side by side (names after quizResults.log):
+
+    quizResults.log          the history, one JSON line per finished quiz,
+                             only ever appended to
+    quizResults.log.lb       leaderboard run: every result as a fixed-size
+                             record sorted by (level, score high to low,
+                             time low to high), mmap'd when opened
+    quizResults.log.pending  results added since the run was last merged,
+                             in arrival order
+    quizResults.log.summary  running totals per level and operation (JSON)
+    quizResults.log.lock     empty; locked while any of the others change
+
+Recording a quiz appends one log line and one 16-byte pending record and
+bisects it into the in-memory sorted pending list (O(log n)). Once
+MERGE_AT results are pending they are merged into the run in one
+sequential pass. A place on a leaderboard is a bisect over the run and
+the pending list; a top-N list reads N records and the N log lines they
+point to. Accuracy and time per question come from the summary, so the
+results screen never reads the history itself.
+
+The summary is saved every SUMMARY_EVERY results and on close(); it notes
+how much of the log it covers, and anything after that is replayed from
+the log when the store is next opened. If the side files are missing or
+do not match the log they are rebuilt from it.
+
+Several processes may share the files (e.g. the desktop quiz and
+quiz_server.py). Each change is made under an exclusive lock on the lock
+file, after first taking in whatever the others have appended to the log
+since this store last looked; queries take it in too.
+"""
+import os
+import json
+import argparse
+import contextlib
+import mmap
+import time
+import heapq
+import bisect
+import struct
+from itertools import islice
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from quiz_engine import POINTS
+from quiz_problems import LEVELS, OPERATIONS
+
+DEFAULT_RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "quizResults.log")
+LEVEL_NAMES = tuple(LEVELS)
+# level, score, milliseconds taken, log offset of the result (16 bytes)
+RECORD = struct.Struct("<BxHIQ")
+# magic, version, results in the run, log bytes they cover
+RUN_HEADER = struct.Struct("<4sIQQ")
+RUN_MAGIC = b"QZLB"
+RUN_VERSION = 1
+SUMMARY_VERSION = 1
+MERGE_AT = 4096  # pending results before they are merged into the run
+SUMMARY_EVERY = 100  # results between summary saves
+
+
+def _key(level, score, millis, offset):
+    # Sorts best first within each level; earlier results win ties
+    return (level, -score, millis, offset)
+
+
+@contextlib.contextmanager
+def _locked(path):
+    """Hold an exclusive lock on the file ``path`` across processes."""
+    with open(path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)  # released when fh is closed
+            yield
+            return
+        fh.seek(0)
+        while True:
+            try:
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:  # gave up after ten one-second tries
+                continue
+        try:
+            yield
+        finally:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _empty_totals():
+    return {"quizzes": 0, "score": 0, "seconds": 0.0,
+            "ops": {op: {"questions": 0, "first_try": 0, "second_try": 0,
+                         "wrong": 0, "seconds": 0.0} for op in OPERATIONS}}
+
+
+class _Run:
+    """Sorted leaderboard keys read straight from the mmap'd run file."""
+
+    def __init__(self, data=None, count=0):
+        self._data = data
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        level, score, millis, offset = RECORD.unpack_from(
+            self._data, RUN_HEADER.size + i * RECORD.size)
+        return _key(level, score, millis, offset)
+
+
+class ResultsStore:
+    """Append-only quiz results with leaderboards; see the module docstring."""
+
+    def __init__(self, path=DEFAULT_RESULTS_FILE):
+        self.path = path
+        self._map = None
+        self._run = _Run()
+        self._run_covers = 0
+        self._run_starts = [0] * (len(LEVEL_NAMES) + 1)
+        self._pending = []
+        self._unsaved = 0
+        with self._locked():
+            self._open()
+
+    # ---------- files ----------
+    def _side(self, ext):
+        return self.path + ext
+
+    def _locked(self):
+        return _locked(self._side(".lock"))
+
+    def _open(self):
+        with open(self.path, "ab"):
+            pass  # create the log on first use
+        self._trim_log()
+        size = os.path.getsize(self.path)
+        try:
+            summary = self._read_summary()
+            if summary["log_size"] > size:
+                raise ValueError("summary is ahead of the log")
+            self._map_run()
+            if self._run_covers > summary["log_size"]:
+                raise ValueError("run is ahead of the summary")
+            self._read_pending()
+            self.totals = summary["levels"]
+            self._covered = summary["log_size"]
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            self._rebuild()
+            return
+        self._replay(self._covered, {key[3] for key in self._pending})
+
+    def _trim_log(self):
+        """Drop a half-written last line left by a crash."""
+        with open(self.path, "rb+") as fh:
+            size = fh.seek(0, os.SEEK_END)
+            if not size:
+                return
+            fh.seek(max(0, size - 4096))
+            tail = fh.read()
+            if tail.endswith(b"\n"):
+                return
+            cut = tail.rfind(b"\n")
+            fh.truncate(size - len(tail) + cut + 1 if cut >= 0 else max(0, size - len(tail)))
+
+    def _read_summary(self):
+        with open(self._side(".summary")) as fh:
+            summary = json.load(fh)
+        if summary.get("version") != SUMMARY_VERSION:
+            raise ValueError("old summary")
+        if set(summary["levels"]) != set(LEVEL_NAMES):
+            raise ValueError("summary is for other levels")
+        return summary
+
+    def _map_run(self):
+        self._close_run()
+        try:
+            fh = open(self._side(".lb"), "rb")
+        except FileNotFoundError:
+            return
+        with fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                raise ValueError("empty run file")
+            data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, covers = RUN_HEADER.unpack_from(data)
+        if (magic != RUN_MAGIC or version != RUN_VERSION
+                or len(data) != RUN_HEADER.size + count * RECORD.size):
+            data.close()
+            raise ValueError("bad run file")
+        self._map = data
+        self._run = _Run(data, count)
+        self._run_covers = covers
+        self._run_starts = [bisect.bisect_left(self._run, (level,))
+                            for level in range(len(LEVEL_NAMES) + 1)]
+
+    def _read_pending(self):
+        try:
+            with open(self._side(".pending"), "rb") as fh:
+                raw = fh.read()
+        except FileNotFoundError:
+            raw = b""
+        whole = len(raw) - len(raw) % RECORD.size
+        if whole != len(raw):
+            # Half-written record: it is replayed from the log instead
+            with open(self._side(".pending"), "rb+") as fh:
+                fh.truncate(whole)
+        keys = [_key(*rec) for rec in RECORD.iter_unpack(raw[:whole])]
+        keys.sort()
+        self._pending = keys
+
+    def _replay(self, start, already=()):
+        """Index the log lines from byte ``start`` on; lines the run
+        covers or whose offsets are in ``already`` are pending already.
+
+        A line that is not a result is skipped. A half-written last line
+        (a writer crashed) is cut off, so the next result starts cleanly.
+        """
+        with open(self.path, "rb+") as fh:
+            fh.seek(start)
+            offset = start
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    fh.truncate(offset)
+                    break
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    result = None
+                if isinstance(result, dict) and result.get("level") in LEVEL_NAMES:
+                    pending = offset >= self._run_covers and offset not in already
+                    self._index(offset, result, pending)
+                offset += len(line)
+        if offset != self._covered:
+            self._covered = offset
+            self._save_summary()
+
+    def _rebuild(self):
+        """Recreate every side file from the log."""
+        self._close_run()
+        for ext in (".lb", ".pending"):
+            try:
+                os.remove(self._side(ext))
+            except FileNotFoundError:
+                pass
+        self._pending = []
+        self.totals = {level: _empty_totals() for level in LEVEL_NAMES}
+        self._covered = 0
+        self._replay(0)
+        self._merge()
+
+    def _sync(self):
+        """Take in results other processes added to the log since this
+        store last looked (with the lock held)."""
+        if os.path.getsize(self.path) == self._covered:
+            return
+        try:
+            # They may have merged, which replaces the run and empties
+            # the pending file
+            self._map_run()
+            self._read_pending()
+        except (OSError, ValueError, struct.error):
+            self._rebuild()
+            return
+        self._replay(self._covered, {key[3] for key in self._pending})
+
+    def refresh(self):
+        """Catch up with results recorded by other processes."""
+        if os.path.getsize(self.path) != self._covered:
+            with self._locked():
+                self._sync()
+
+    def _save_summary(self):
+        tmp = self._side(".summary.tmp")
+        with open(tmp, "w") as fh:
+            json.dump({"version": SUMMARY_VERSION, "log_size": self._covered,
+                       "levels": self.totals}, fh)
+        os.replace(tmp, self._side(".summary"))
+        self._unsaved = 0
+
+    def _close_run(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._run = _Run()
+        self._run_covers = 0
+        self._run_starts = [0] * (len(LEVEL_NAMES) + 1)
+
+    def close(self):
+        if self._unsaved:
+            with self._locked():
+                self._sync()
+                self._save_summary()
+        self._close_run()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- recording ----------
+    def _index(self, offset, result, add_pending=True):
+        level = LEVEL_NAMES.index(result["level"])
+        key = _key(level, result["score"], int(result["seconds"] * 1000), offset)
+        if add_pending:
+            with open(self._side(".pending"), "ab") as fh:
+                fh.write(RECORD.pack(key[0], -key[1], key[2], key[3]))
+            bisect.insort(self._pending, key)
+        totals = self.totals[result["level"]]
+        totals["quizzes"] += 1
+        totals["score"] += result["score"]
+        totals["seconds"] += result["seconds"]
+        for op, points, seconds in result["questions"]:
+            counts = totals["ops"][op]
+            counts["questions"] += 1
+            counts["first_try" if points == POINTS[0] else "second_try" if points else "wrong"] += 1
+            counts["seconds"] += seconds
+        return key
+
+    def record(self, session, name=""):
+        """Add a finished QuizSession; returns its place on its level's
+        leaderboard (1 is best)."""
+        if not session.finished:
+            raise ValueError("the quiz is not finished yet")
+        ops = session.problems.ops
+        result = {"time": round(time.time(), 3), "name": name, "level": session.level,
+                  "seed": session.seed, "score": session.score,
+                  "seconds": round(sum(session.seconds), 3),
+                  "questions": [[OPERATIONS[ops[i]], points, round(seconds, 3)]
+                                for i, (points, seconds)
+                                in enumerate(zip(session.points, session.seconds))]}
+        line = (json.dumps(result, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._locked():
+            self._sync()
+            with open(self.path, "ab") as fh:
+                offset = fh.seek(0, os.SEEK_END)
+                fh.write(line)
+            key = self._index(offset, result)
+            self._covered = offset + len(line)
+            self._unsaved += 1
+            if len(self._pending) >= MERGE_AT:
+                self._merge()
+            elif self._unsaved >= SUMMARY_EVERY:
+                self._save_summary()
+        return self._before(key) - self._level_start(key[0]) + 1
+
+    def merge(self):
+        """Fold the pending results into the sorted run file."""
+        with self._locked():
+            self._sync()
+            self._merge()
+
+    def _merge(self):
+        count = len(self._run) + len(self._pending)
+        tmp = self._side(".lb.tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(RUN_HEADER.pack(RUN_MAGIC, RUN_VERSION, count, self._covered))
+            # Copy the run through in slices, writing each pending record
+            # where it bisects in, so the bulk of it is never unpacked
+            data = memoryview(self._map or b"")[RUN_HEADER.size:]
+            done = 0
+            for key in self._pending:
+                cut = bisect.bisect_left(self._run, key, done)
+                fh.write(data[done * RECORD.size:cut * RECORD.size])
+                fh.write(RECORD.pack(key[0], -key[1], key[2], key[3]))
+                done = cut
+            fh.write(data[done * RECORD.size:])
+            data.release()
+        # The summary must cover everything the run does before the
+        # pending file goes
+        self._save_summary()
+        self._close_run()
+        os.replace(tmp, self._side(".lb"))
+        with open(self._side(".pending"), "wb"):
+            pass
+        self._pending = []
+        self._map_run()
+
+    # ---------- queries ----------
+    def _before(self, key):
+        return bisect.bisect_left(self._run, key) + bisect.bisect_left(self._pending, key)
+
+    def _level_start(self, level):
+        # Level boundaries in the run only move when it is merged
+        return self._run_starts[level] + bisect.bisect_left(self._pending, (level,))
+
+    def count(self, level):
+        """Results recorded for ``level``."""
+        self.refresh()
+        index = LEVEL_NAMES.index(level)
+        return self._level_start(index + 1) - self._level_start(index)
+
+    def place(self, level, score, seconds):
+        """Where a result would come on ``level``'s leaderboard (1 is best)."""
+        self.refresh()
+        index = LEVEL_NAMES.index(level)
+        key = _key(index, score, int(seconds * 1000), -1)
+        return self._before(key) - self._level_start(index) + 1
+
+    def top(self, level, n=10):
+        """The best ``n`` results for ``level``, best first, as dicts with
+        name, score, seconds and time (reads just those ``n`` log lines)."""
+        self.refresh()
+        index = LEVEL_NAMES.index(level)
+        first = (index,)
+        runs = []
+        for run in (self._run, self._pending):
+            start = bisect.bisect_left(run, first)
+            runs.append(map(run.__getitem__, range(start, len(run))))
+        best = []
+        for key in islice(heapq.merge(*runs), n):
+            if key[0] != index:
+                break
+            best.append(key[3])
+        found = []
+        with open(self.path, "rb") as fh:
+            for offset in best:
+                fh.seek(offset)
+                result = json.loads(fh.readline())
+                found.append({k: result[k] for k in ("name", "score", "seconds", "time")})
+        return found
+
+    def accuracy(self, level=None):
+        """Per operation: questions asked, share right first time, share
+        right at all, and mean seconds per question."""
+        self.refresh()
+        levels = LEVEL_NAMES if level is None else (level,)
+        report = {}
+        for op in OPERATIONS:
+            counts = [self.totals[lv]["ops"][op] for lv in levels]
+            questions = sum(c["questions"] for c in counts)
+            first = sum(c["first_try"] for c in counts)
+            second = sum(c["second_try"] for c in counts)
+            seconds = sum(c["seconds"] for c in counts)
+            report[op] = {"questions": questions,
+                          "first_try": first / questions if questions else None,
+                          "correct": (first + second) / questions if questions else None,
+                          "seconds_per_question": seconds / questions if questions else None}
+        return report
+
+    def summary(self, level):
+        """Quizzes, mean score and mean seconds per question for ``level``."""
+        self.refresh()
+        totals = self.totals[level]
+        quizzes = totals["quizzes"]
+        questions = sum(c["questions"] for c in totals["ops"].values())
+        return {"quizzes": quizzes,
+                "mean_score": totals["score"] / quizzes if quizzes else None,
+                "seconds_per_question": totals["seconds"] / questions if questions else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maths Quiz leaderboards and analytics.")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE, help="results log")
+    parser.add_argument("--level", choices=LEVELS, default="easy")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    with ResultsStore(args.results) as store:
+        report = {"level": args.level, "results": store.count(args.level),
+                  "summary": store.summary(args.level),
+                  "accuracy": store.accuracy(args.level),
+                  "top": store.top(args.level, args.top)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Serve the Maths Quiz over HTTP/JSON to many students (asyncio, stdlib only).
+
+    python quiz_server.py --port 8081
+
+Endpoints (JSON bodies and responses):
+    POST /quiz                 start a quiz: {"level": "easy"}
+    GET  /quiz/<id>            the quiz's state (question on show, score, ...)
+    POST /quiz/<id>/answer     answer the question on show: {"answer": 12}
+    GET  /leaderboard?level=easy&limit=10   best results at a level
+    GET  /analytics?level=easy  accuracy and seconds per question by operation
+    GET  /stats                request, connection and session counters
+
+With --results, finished quizzes are added to a quiz_results.ResultsStore
+(the desktop quiz's by default) and the answer that finishes a quiz also
+gives its leaderboard "place"; POST /quiz may then include a "name".
+
+Each quiz is a QuizSession from quiz_engine.py, so the scoring and ranks
+are those of the desktop quiz. A quiz's id is returned when it is started
+and is all a client needs to carry on with it; one connection may run
+many quizzes at once. The state never contains the answer to the
+question on show, and the server picks every quiz's seed (a client that
+knew it could generate all the answers). Connections stay open between
+requests (HTTP/1.1 keep-alive). quiz_loadtest.py measures throughput.
+
+The HTTP plumbing is json_http.py at the top of the repository, shared
+with joke_server.py.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import secrets
+import sys
+import time
+from urllib.parse import parse_qs
+
+from quiz_engine import QuizSession
+from quiz_problems import LEVELS
+from quiz_results import DEFAULT_RESULTS_FILE, ResultsStore
+
+try:
+    from json_http import MAX_HEADER_BYTES, HttpError, JsonHttpServer
+except ImportError:
+    # Run from this folder: json_http.py is two levels up
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 os.pardir, os.pardir))
+    from json_http import MAX_HEADER_BYTES, HttpError, JsonHttpServer
+
+SESSION_TTL = 30 * 60  # seconds before an untouched quiz is dropped
+MAX_SESSIONS = 100000  # oldest quizzes are dropped beyond this
+MAX_BODY_BYTES = 1024
+MAX_NAME = 40
+MAX_LEADERBOARD = 100
+
+
+class QuizServer(JsonHttpServer):
+    max_body = MAX_BODY_BYTES
+
+    def __init__(self, results=None):
+        super().__init__()
+        self.results = results
+        self.sessions = collections.OrderedDict()
+        self.started = time.monotonic()
+        self.quizzes_started = 0
+        self.quizzes_finished = 0
+
+    # ---------- sessions ----------
+    def _expire(self, now):
+        # Quizzes are kept in least-recently-used order, so expired ones
+        # are always at the front
+        while self.sessions:
+            last_used = next(iter(self.sessions.values()))[0]
+            if now - last_used < SESSION_TTL and len(self.sessions) < MAX_SESSIONS:
+                break
+            self.sessions.popitem(last=False)
+
+    def new_session(self, level, name=""):
+        now = time.monotonic()
+        self._expire(now)
+        session = QuizSession(level)
+        token = secrets.token_urlsafe(12)
+        # [last used, session, student name]
+        self.sessions[token] = [now, session, name]
+        self.quizzes_started += 1
+        return token, session
+
+    def session(self, token):
+        """The [last used, session, name] entry for ``token``."""
+        entry = self.sessions.get(token)
+        if entry is None:
+            raise HttpError(404, f"no quiz {token}")
+        entry[0] = time.monotonic()
+        self.sessions.move_to_end(token)
+        return entry
+
+    # ---------- endpoints ----------
+    def route(self, method, path, query, body):
+        """Returns (status, response body)."""
+        if path == "/quiz":
+            _require(method, "POST")
+            level = body.get("level", "easy")
+            if not isinstance(level, str):
+                raise HttpError(400, "level must be a string")
+            if "seed" in body:
+                raise HttpError(400, "the server chooses the seed")
+            name = body.get("name", "")
+            if not isinstance(name, str):
+                raise HttpError(400, "name must be a string")
+            try:
+                token, session = self.new_session(level, name[:MAX_NAME])
+            except ValueError as ex:
+                raise HttpError(400, str(ex))
+            return 201, dict(session.state(), id=token)
+        if path.startswith("/quiz/"):
+            token, _, action = path[len("/quiz/"):].partition("/")
+            _, session, name = self.session(token)
+            if not action:
+                _require(method, "GET")
+                return 200, dict(session.state(), id=token)
+            if action != "answer":
+                raise HttpError(404, f"unknown path {path}")
+            _require(method, "POST")
+            answer = body.get("answer")
+            if not isinstance(answer, int) or isinstance(answer, bool):
+                raise HttpError(400, "answer must be a whole number")
+            if session.finished:
+                raise HttpError(409, "the quiz is already finished")
+            outcome = session.answer(answer)
+            response = dict(session.state(), id=token, result=outcome.result,
+                            points=outcome.points)
+            if outcome.finished:
+                self.quizzes_finished += 1
+                if self.results is not None:
+                    response["place"] = self.results.record(session, name)
+            if outcome.correct_answer is not None:
+                response["correct_answer"] = outcome.correct_answer
+            return 200, response
+        if path in ("/leaderboard", "/analytics"):
+            _require(method, "GET")
+            if self.results is None:
+                raise HttpError(404, "results are not being kept; start with --results")
+            level = query.get("level", ["easy"])[0]
+            if level not in LEVELS:
+                raise HttpError(400, f"unknown level {level!r}")
+            if path == "/analytics":
+                return 200, {"level": level, "results": self.results.count(level),
+                             "summary": self.results.summary(level),
+                             "accuracy": self.results.accuracy(level)}
+            try:
+                limit = max(0, min(int(query.get("limit", ["10"])[0]), MAX_LEADERBOARD))
+            except ValueError:
+                raise HttpError(400, "limit must be a number")
+            return 200, {"level": level, "results": self.results.count(level),
+                         "top": self.results.top(level, limit)}
+        if path == "/stats":
+            _require(method, "GET")
+            return 200, {"requests": self.requests, "connections": self.connections,
+                         "open_connections": self.open_connections,
+                         "sessions": len(self.sessions),
+                         "quizzes_started": self.quizzes_started,
+                         "quizzes_finished": self.quizzes_finished,
+                         "uptime_s": round(time.monotonic() - self.started, 1)}
+        raise HttpError(404, f"unknown path {path}")
+
+    # ---------- HTTP ----------
+    def request(self, method, url, headers, body, reply_headers):
+        try:
+            body = json.loads(body) if body else {}
+        except ValueError:
+            raise HttpError(400, "body must be JSON")
+        if not isinstance(body, dict):
+            raise HttpError(400, "body must be a JSON object")
+        return self.route(method, url.path, parse_qs(url.query), body)
+
+
+def _require(method, allowed):
+    if method != allowed:
+        raise HttpError(405, f"use {allowed} here")
+
+
+async def serve(host="127.0.0.1", port=8081, ready=None, results_file=None):
+    results = ResultsStore(results_file) if results_file else None
+    try:
+        server = QuizServer(results)
+        listener = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER_BYTES)
+        addresses = ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+        print(f"Serving the Maths Quiz on {addresses}", flush=True)
+        if ready is not None:
+            ready.set()
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        if results is not None:
+            results.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON Maths Quiz server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--results", nargs="?", const=DEFAULT_RESULTS_FILE,
+                        help="keep finished quizzes in this results log "
+                             "(the desktop quiz's if no file is given)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, results_file=args.results))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
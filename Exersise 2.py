@@ -1,62 +1,88 @@
+import os
+import sys
+import threading
+import time
 import tkinter as tk
 from tkinter import font
 import random
 
+from joke_core import (DEFAULT_JOKES_FILE, JokeCorpus, Prefetcher, ShuffleScheduler,
+                       save_state, state_path)
+
+# Jokes kept ready by the background prefetch worker
+PREFETCH_DEPTH = 4
+# Search results listed under the search box
+SEARCH_RESULTS = 8
+# How often the UI checks whether the jokes and search index are ready
+LOAD_POLL_MS = 100
+
 class JokeAssistant:
     def __init__(self, master):
         self.master = master
         master.title("Joke-Telling Assistant")
-        master.geometry("600x400")
+        master.geometry("600x600")
         master.configure(bg="#f0f0f0")
 
-        # Jokes list (setup, punchline)
-        self.joke_list = self.get_jokes()
+        # Jokes corpus, indexable like a list of (setup, punchline), and the
+        # shuffled order with no repeats; both are opened by start()
+        self.joke_list = []
+        self.scheduler = None
+        self.prefetch = None
+        self.shuffled = True
         self.active_joke = None
+        self.active_index = None
         self.is_punchline_visible = False
 
         # Build all GUI Elements
         self.build_ui()
+        self.setup_text.config(text="Loading jokes...")
+        self.alexa_button.config(state=tk.DISABLED)
+
+        self.search_index = None
+        self.search_hits = []
+        self.loaded_jokes = None
+        self.loaded_index = None
+
+    def start(self):
+        # Corpus, order and search index are opened in the background once
+        # the window is on screen
+        threading.Thread(target=self.load_jokes, daemon=True).start()
+        self.master.after(LOAD_POLL_MS, self.poll_jokes)
+
+    def load_jokes(self):
+        # Runs on a worker thread; the order is resumed from the last session.
+        # A failure is handed over like a result, for poll_jokes to show
+        try:
+            jokes = self.get_jokes()
+            scheduler = ShuffleScheduler.load(state_path(DEFAULT_JOKES_FILE), len(jokes))
+        except Exception as ex:
+            self.loaded_jokes = ex
+            return
+        self.loaded_jokes = jokes, scheduler
+        if jokes:
+            self.load_search_index(jokes)
+
+    def poll_jokes(self):
+        if self.loaded_jokes is None:
+            self.master.after(LOAD_POLL_MS, self.poll_jokes)
+            return
+        if isinstance(self.loaded_jokes, Exception):
+            self.setup_text.config(text=f"Could not load jokes: {self.loaded_jokes}")
+            return
+        self.joke_list, self.scheduler = self.loaded_jokes
+        self.setup_text.config(text="Click the button to hear a joke!")
+        self.alexa_button.config(state=tk.NORMAL)
+        if self.joke_list:
+            # Upcoming jokes are picked and parsed on a background thread
+            self.prefetch = Prefetcher(self.produce_joke, PREFETCH_DEPTH)
+            self.master.after(LOAD_POLL_MS, self.poll_search_index)
 
     def get_jokes(self):
-        return [
-            ("Why did the chicken cross the road?", "To get to the other side."),
-            ("What happens if you boil a clown?", "You get a laughing stock."),
-            ("Why did the car get a flat tire?", "Because there was a fork in the road!"),
-            ("How did the hipster burn his mouth?", "He ate his pizza before it was cool."),
-            ("What did the janitor say when he jumped out of the closet?", "SUPPLIES!!!!"),
-            ("Have you heard about the band 1023MB?", "It's because they haven't got a gig yet…"),
-            ("Why does the golfer wear two pants?", "In case he gets a hole-in-one."),
-            ("Why should you wear glasses to maths class?", "Because it helps with division."),
-            ("Why does it take pirates so long to learn the alphabet?", "They spend years at C."),
-            ("Why did the woman date the mushroom?", "Because he was a fun-ghi."),
-            ("Why do bananas never get lonely?", "Because they hang out in bunches."),
-            ("What did the buffalo say when his son left?", "Bison."),
-            ("Why shouldn't secrets be told in a cornfield?", "Too many ears."),
-            ("What do you call someone who hates carbs?", "Lack-Toast Intolerant."),
-            ("Why did the can crusher quit?", "It was soda pressing."),
-            ("Why did the birthday boy wrap himself?", "He wanted to live in the present."),
-            ("What does a house wear?", "A dress."),
-            ("Why couldn't the toilet paper cross?", "It got stuck in a crack."),
-            ("Why didn't the bike go anywhere?", "It was two-tired!"),
-            ("Want to hear a pizza joke?", "Never mind. It's too cheesy."),
-            ("Why are chemists great problem solvers?", "They have all the solutions."),
-            ("Why can't you starve in a desert?", "Because of the sand which is there!"),
-            ("What did the cheese say to the mirror?", "Halloumi!"),
-            ("Why did the developer go broke?", "He used up all his cache."),
-            ("Why don't ants get sick?", "They have little antibodies."),
-            ("Why did the donut see a dentist?", "To get a filling."),
-            ("What do you call a bear with no teeth?", "A gummy bear!"),
-            ("What do vegan zombies eat?", "Graaains."),
-            ("What do you call a one-eyed dinosaur?", "Do-you-think-he-saw-us!"),
-            ("Why not fall in love with a tennis player?", "Because to them love means NOTHING!"),
-            ("What did the full glass say to the empty one?", "You look drunk."),
-            ("What’s a potato’s favorite transport?", "The gravy train."),
-            ("What did one ocean say to the other?", "Nothing. They waved."),
-            ("What did the right eye say to the left?", "Between you and me, something smells."),
-            ("What do you call a dog run over by a steamroller?", "Spot!"),
-            ("What's the difference between a hippo and a zippo?", "One's heavy; the other's a little lighter."),
-            ("Why don't scientists trust atoms?", "They make up everything.")
-        ]
+        # Indexed, memory-mapped corpus: only the chosen joke is ever read
+        try:
+            return JokeCorpus(DEFAULT_JOKES_FILE)
+        except OSError:
+            return []
 
     def build_ui(self):
         # Title
@@ -109,8 +135,49 @@ class JokeAssistant:
                   bg="#95a5a6", fg="white", font=("Arial", 12, "bold"),
                   padx=20, pady=10).grid(row=0, column=3, padx=5)
 
+        # Scheduler mode: shuffled without repeats, or independent random draws
+        self.no_repeats = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.master, text="No repeats until every joke is told",
+                       variable=self.no_repeats, command=self.set_mode,
+                       bg="#f0f0f0").pack()
+
+        # Search box: words or word prefixes, best matches listed below
+        search_area = tk.Frame(self.master, bg="#f0f0f0")
+        search_area.pack(fill=tk.X, padx=30, pady=5)
+        tk.Label(search_area, text="Search:", bg="#f0f0f0").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_area, textvariable=self.search_var, state=tk.DISABLED)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.bind("<KeyRelease>", lambda event: self.run_search())
+        self.search_entry = search_entry
+        self.similar_button = tk.Button(search_area, text="More like this", state=tk.DISABLED,
+                                        command=self.show_similar)
+        self.similar_button.pack(side=tk.LEFT)
+        self.results_list = tk.Listbox(self.master, height=5)
+        self.results_list.pack(fill=tk.X, padx=30)
+        self.results_list.bind("<<ListboxSelect>>", lambda event: self.open_result())
+
+        # Prefetch buffer depth and hit rate, for tuning PREFETCH_DEPTH
+        self.stats_text = tk.Label(self.master, text="", bg="#f0f0f0", fg="#7f8c8d",
+                                   font=("Arial", 9))
+        self.stats_text.pack(side=tk.BOTTOM, pady=2)
+
     def new_joke(self):
-        self.active_joke = random.choice(self.joke_list)
+        if not self.joke_list:
+            self.setup_text.config(text="No jokes found in " + os.path.basename(DEFAULT_JOKES_FILE))
+            return
+        index, joke, state = self.prefetch.get()
+        if state is not None:
+            # Remember the order up to the joke on screen, not the buffer
+            try:
+                save_state(self.scheduler.state_file, state)
+            except OSError:
+                pass  # read-only folder: the order just restarts next time
+        self.show_joke(index, joke)
+        self.show_prefetch_stats()
+
+    def show_joke(self, index, joke):
+        self.active_index, self.active_joke = index, joke
         self.is_punchline_visible = False
 
         self.setup_text.config(text=self.active_joke[0])
@@ -119,6 +186,81 @@ class JokeAssistant:
         self.alexa_button.config(state=tk.DISABLED)
         self.show_button.config(state=tk.NORMAL)
         self.next_button.config(state=tk.NORMAL)
+        if self.search_index is not None:
+            self.similar_button.config(state=tk.NORMAL)
+
+    def produce_joke(self):
+        # Runs on the prefetch thread; only it touches the scheduler
+        if not self.shuffled:
+            index = random.randrange(len(self.joke_list))
+            return index, self.joke_list[index], None
+        index = self.scheduler.next()
+        return index, self.joke_list[index], self.scheduler.state()
+
+    def load_search_index(self, jokes):
+        # Runs on a worker thread; indexes only jokes added since last time.
+        # A failure is handed over like a result, for poll_search_index
+        try:
+            from joke_search import JokeSearch
+
+            index = JokeSearch.open(jokes)
+            index.update(jokes)
+        except Exception as ex:
+            self.loaded_index = ex
+            return
+        if index.dirty:
+            try:
+                index.save(jokes)
+            except OSError:
+                pass  # read-only folder: keep the in-memory index
+        self.loaded_index = index
+
+    def poll_search_index(self):
+        # Tk calls stay on the main thread, so the worker only sets a field
+        if self.loaded_index is None:
+            self.master.after(LOAD_POLL_MS, self.poll_search_index)
+            return
+        if isinstance(self.loaded_index, Exception):
+            # The entry stays disabled; jokes still work without search
+            self.search_var.set(f"Search unavailable: {self.loaded_index}")
+            return
+        self.search_index = self.loaded_index
+        self.search_entry.config(state=tk.NORMAL)
+        if self.active_index is not None:
+            self.similar_button.config(state=tk.NORMAL)
+
+    def run_search(self):
+        query = self.search_var.get().strip()
+        hits = self.search_index.search(query, SEARCH_RESULTS, prefix=True) if query else []
+        self.list_results(hits)
+
+    def show_similar(self):
+        if self.active_index is not None:
+            self.list_results(self.search_index.more_like_this(self.joke_list, self.active_index,
+                                                                SEARCH_RESULTS))
+
+    def list_results(self, hits):
+        self.search_hits = [index for _, index in hits]
+        self.results_list.delete(0, tk.END)
+        for index in self.search_hits:
+            self.results_list.insert(tk.END, self.joke_list[index][0])
+
+    def open_result(self):
+        selection = self.results_list.curselection()
+        if selection:
+            index = self.search_hits[selection[0]]
+            self.show_joke(index, self.joke_list[index])
+
+    def set_mode(self):
+        self.shuffled = self.no_repeats.get()
+        if self.prefetch:
+            self.prefetch.clear()
+
+    def show_prefetch_stats(self):
+        stats = self.prefetch.stats()
+        requests = stats['hits'] + stats['misses']
+        self.stats_text.config(text=f"Prefetch {stats['buffered']}/{stats['depth']} buffered, "
+                                    f"hit rate {stats['hit_rate']:.0%} of {requests}")
 
     def reveal_punchline(self):
         if self.active_joke and not self.is_punchline_visible:
@@ -129,7 +271,34 @@ class JokeAssistant:
             self.alexa_button.config(state=tk.NORMAL)
 
 
+def first_frame(window, started):
+    # Draw the window now; STARTUP_REPORT=1 prints how long that took to
+    # stderr and STARTUP_REPORT=exit also asks to close (startup_bench.py)
+    window.update()
+    mode = os.environ.get("STARTUP_REPORT", "")
+    if mode in ("", "0"):
+        return False
+    now = time.perf_counter()
+    message = f"startup: first frame {(now - started) * 1e3:.1f} ms after main()"
+    launched = os.environ.get("STARTUP_T0")
+    if launched:
+        message += f", {(now - float(launched)) * 1e3:.1f} ms after launch"
+    print(message, file=sys.stderr, flush=True)
+    return mode == "exit"
+
+
+def main():
+    started = time.perf_counter()
+    root = tk.Tk()
+    app = JokeAssistant(root)
+    # Show the window before the corpus is opened
+    if first_frame(root, started):
+        root.destroy()
+        return
+    app.start()
+    root.mainloop()
+
+
 # Start app
-root = tk.Tk()
-JokeAssistant(root)
-root.mainloop()
+if __name__ == "__main__":
+    main()
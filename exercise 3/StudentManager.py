@@ -1,126 +1,271 @@
 import os
-import csv
+import time
+import importlib
 import tkinter as tk
-from tkinter import ttk, simpledialog, messagebox, filedialog
-
-# ----------------- Path handling -----------------
-
-
-def get_default_data_file():
-    """
-    Return a safe, portable default path for the data file.
-    - Prefer the folder where this script is located.
-    - Fall back to current working directory if __file__ is not available.
-    """
-    try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        if not base_dir:
-            raise Exception
-    except Exception:
-        # Fallback: where the program is run from
-        base_dir = os.getcwd()
-
-    return os.path.join(base_dir, 'student_info.txt')
-
-
-# Defaults & constants (must be defined before functions that use them)
-DEFAULT_DATA_FILE = get_default_data_file()
-POSSIBLE_TOTAL = 160  # coursework total (3*20) + exam (100) => 160
+from tkinter import ttk, messagebox
+
+from marks_data import (
+    DEFAULT_DATA_FILE,
+    SNAPSHOT_EXT,
+    JOURNAL_COMPACT_BYTES,
+    RecordStore,
+    LoadCancelled,
+    LoadProgress,
+    load_store,
+    write_records,
+    append_journal_many,
+    cohort_files,
+    ingest_cohorts,
+    write_cohorts,
+    cohort_stats,
+    cw_sum,
+    compute_percentage,
+    grade_from_percentage,
+    validate_record,
+)
+import marks_perf as perf
+
+
+class _LazyModule:
+    """Stands in for a module that is only imported when first used, so
+    start-up does not pay for dialogs that may never be opened."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+filedialog = _LazyModule('tkinter.filedialog')
+simpledialog = _LazyModule('tkinter.simpledialog')
 
+# ----------------- GUI application -----------------
 
-# ----------------- File utilities -----------------
+TYPE_AHEAD_LIMIT = 200  # rows shown for a search-box prefix query
+IO_POLL_MS = 100  # how often the UI checks on background file work
+JOURNAL_FLUSH_MS = 250  # edits within this window share one journal write
+SAVE_DELAY_MS = 1000  # full-file saves requested within this window coalesce
+DEBUG_REFRESH_MS = 500  # how often the debug panel re-reads the counters
 
+DATA_FILETYPES = [
+    ('Text', '*.txt'),
+    ('CSV', '*.csv'),
+    ('Snapshot', '*' + SNAPSHOT_EXT),
+    ('All', '*.*'),
+]
 
-def init_data_file(path=DEFAULT_DATA_FILE):
-    """Ensure directory and file exist. If missing, initialize with 0 count."""
-    dirn = os.path.dirname(path) or '.'
-    os.makedirs(dirn, exist_ok=True)
-    if not os.path.exists(path):
-        with open(path, 'w', newline='') as fh:
-            fh.write('0\n')
 
+class VirtualTable(ttk.Frame):
+    """Record table that only formats the rows currently on screen.
 
-def read_records(path=DEFAULT_DATA_FILE):
-    """Return list of records where each record is a dict with keys:
-    id(int), fullname(str), cw_a(int), cw_b(int), cw_c(int), exam(int)
+    The Treeview holds just enough items to fill its height; scrolling
+    re-fills those items from ``fetch(i)`` for the visible window, so the
+    cost of showing a cohort does not depend on its size. Clicking a
+    heading asks ``sorter(column, reverse)`` for a new ``fetch``.
     """
-    init_data_file(path)
-    records = []
-    with open(path, 'r', newline='') as fh:
-        reader = csv.reader(fh)
-        rows = [r for r in reader if r]
-    if not rows:
-        return []
-    # If first row is single integer, treat as count header
-    start = 0
-    if len(rows[0]) == 1 and rows[0][0].strip().isdigit():
-        start = 1
-    for row in rows[start:]:
-        row = [c.strip() for c in row]
-        if len(row) < 6:
-            continue
+
+    COLUMNS = (
+        ('id', 'Student ID', 90),
+        ('fullname', 'Full name', 220),
+        ('cohort', 'Cohort', 110),
+        ('cw_total', 'Coursework /60', 110),
+        ('exam', 'Exam /100', 90),
+        ('pct', 'Overall %', 90),
+        ('grade', 'Grade', 60),
+    )
+
+    def __init__(self, parent, on_open=None):
+        super().__init__(parent)
+        self.on_open = on_open
+        self.count = 0
+        self.top = 0
+        self._fetch = None
+        self._sorter = None
+        self._sort_state = {}
+        self._visible = 0
+
+        cols = [c[0] for c in self.COLUMNS]
+        self.tree = ttk.Treeview(self, columns=cols, show='headings')
+        for key, heading, width in self.COLUMNS:
+            self.tree.heading(key, text=heading, command=lambda k=key: self._sort(k))
+            self.tree.column(key, width=width, anchor='w')
+        self.ybar = ttk.Scrollbar(self, orient='vertical', command=self._yview)
+        self.ybar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        # Scrolling is ours: 'break' stops the Treeview scrolling itself
+        self.tree.bind('<Configure>', lambda e: self._resize())
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.tree.bind('<Prior>', lambda e: self._scroll_by(-self._visible))
+        self.tree.bind('<Next>', lambda e: self._scroll_by(self._visible))
+        self.tree.bind('<Home>', lambda e: self._scroll_by(-self.count))
+        self.tree.bind('<End>', lambda e: self._scroll_by(self.count))
+        self.tree.bind('<Double-1>', self._on_double)
+
+    def set_rows(self, count, fetch, sorter=None):
+        """Show ``count`` rows; ``fetch(i)`` returns the i-th record dict."""
+        self.count = count
+        self._fetch = fetch
+        self._sorter = sorter
+        self._sort_state = {}
+        self.top = 0
+        self._render()
+
+    def _row_height(self):
+        height = ttk.Style(self).lookup('Treeview', 'rowheight')
         try:
-            rid = int(row[0])
-            name = row[1]
-            ca = int(row[2])
-            cb = int(row[3])
-            cc = int(row[4])
-            exam = int(row[5])
-            records.append(
-                {
-                    'id': rid,
-                    'fullname': name,
-                    'cw_a': ca,
-                    'cw_b': cb,
-                    'cw_c': cc,
-                    'exam': exam,
-                }
-            )
-        except ValueError:
-            continue
-    return records
-
-
-def write_records(records, path=DEFAULT_DATA_FILE):
-    """Overwrite file with current list of records. Writes count header first."""
-    dirn = os.path.dirname(path) or '.'
-    os.makedirs(dirn, exist_ok=True)
-    with open(path, 'w', newline='') as fh:
-        writer = csv.writer(fh)
-        writer.writerow([len(records)])
-        for r in records:
-            writer.writerow(
-                [r['id'], r['fullname'], r['cw_a'], r['cw_b'], r['cw_c'], r['exam']]
+            return max(1, int(height))
+        except (TypeError, ValueError):
+            return 20
+
+    def _resize(self):
+        # Headings take roughly one row; leave the rest for records
+        rows = max(1, self.tree.winfo_height() // self._row_height() - 1)
+        if rows != self._visible:
+            self._visible = rows
+            self._render()
+
+    def scroll_to(self, top):
+        top = max(0, min(top, self.count - self._visible))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _yview(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.count))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self._visible
+            self.scroll_to(self.top + step)
+
+    def _scroll_by(self, step):
+        self.scroll_to(self.top + step)
+        return 'break'
+
+    def _on_wheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    @perf.timed('render.table')
+    def _render(self):
+        tree = self.tree
+        items = tree.get_children()
+        want = min(self._visible, self.count - self.top) if self._fetch else 0
+        for iid in items[want:]:
+            tree.delete(iid)
+        for n in range(want):
+            rec = self._fetch(self.top + n)
+            values = (
+                rec['id'],
+                rec['fullname'],
+                rec.get('cohort', ''),
+                rec['cw_total'],
+                rec['exam'],
+                f"{rec['pct']:.2f}",
+                rec['grade'],
             )
+            if n < len(items):
+                tree.item(items[n], values=values)
+            else:
+                tree.insert('', 'end', values=values)
+        if self.count:
+            self.ybar.set(self.top / self.count, (self.top + want) / self.count)
+        else:
+            self.ybar.set(0.0, 1.0)
 
-
-# ----------------- Business helpers -----------------
-
-
-def cw_sum(rec):
-    return rec['cw_a'] + rec['cw_b'] + rec['cw_c']
-
-
-def compute_percentage(rec):
-    tot = cw_sum(rec) + rec['exam']
-    if POSSIBLE_TOTAL <= 0:
-        return 0.0
-    return (tot / POSSIBLE_TOTAL) * 100.0
-
-
-def grade_from_percentage(pct):
-    if pct >= 70:
-        return 'A'
-    if pct >= 60:
-        return 'B'
-    if pct >= 50:
-        return 'C'
-    if pct >= 40:
-        return 'D'
-    return 'F'
-
-
-# ----------------- GUI application -----------------
+    def _sort(self, column):
+        if self._sorter is None:
+            return
+        reverse = not self._sort_state.get(column, True)
+        fetch = self._sorter(column, reverse)
+        sorter = self._sorter
+        self.set_rows(self.count, fetch, sorter)
+        self._sort_state = {column: reverse}
+
+    def _on_double(self, event):
+        iid = self.tree.identify_row(event.y)
+        if iid and self.on_open:
+            self.on_open(self._fetch(self.top + self.tree.index(iid)))
+
+
+class DebugPanel(tk.Toplevel):
+    """Live view of the marks_perf counters, refreshed while open."""
+
+    COLUMNS = (
+        ('name', 'Probe', 180),
+        ('count', 'Calls', 70),
+        ('total_ms', 'Total ms', 90),
+        ('mean_ms', 'Mean ms', 80),
+        ('max_ms', 'Max ms', 80),
+    )
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title('Instrumentation')
+        self.geometry('560x360')
+        self.state_var = tk.StringVar()
+        ttk.Label(self, textvariable=self.state_var, anchor='w').pack(
+            side='top', fill='x', padx=6, pady=4
+        )
+        btnf = ttk.Frame(self)
+        btnf.pack(side='bottom', fill='x', padx=6, pady=6)
+        ttk.Button(btnf, text='Reset', command=self._reset).pack(side='left')
+        ttk.Button(btnf, text='Save stats...', command=self._save).pack(
+            side='left', padx=4
+        )
+        ttk.Button(btnf, text='Close', command=self.destroy).pack(side='right')
+        self.tree = ttk.Treeview(
+            self, columns=[c[0] for c in self.COLUMNS], show='headings'
+        )
+        for key, label, width in self.COLUMNS:
+            self.tree.heading(key, text=label)
+            anchor = 'w' if key == 'name' else 'e'
+            self.tree.column(key, width=width, anchor=anchor, stretch=key == 'name')
+        self.tree.pack(fill='both', expand=True, padx=6)
+        self._refresh()
+
+    def _refresh(self):
+        if not self.winfo_exists():
+            return
+        state = 'on' if perf.enabled else 'off (Help > Instrumentation)'
+        if perf.profiling():
+            state += ', profiling'
+        self.state_var.set(f'Instrumentation {state}')
+        self.tree.delete(*self.tree.get_children())
+        for row in perf.stats():
+            self.tree.insert(
+                '',
+                'end',
+                values=(
+                    row['name'],
+                    row['count'],
+                    f"{row['total_ms']:.1f}",
+                    f"{row['mean_ms']:.3f}",
+                    f"{row['max_ms']:.1f}",
+                ),
+            )
+        self.after(DEBUG_REFRESH_MS, self._refresh)
+
+    def _reset(self):
+        perf.reset()
+        self.tree.delete(*self.tree.get_children())
+
+    def _save(self):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title='Save instrumentation stats',
+            filetypes=[('JSON', '*.json')],
+            defaultextension='.json',
+        )
+        if path:
+            try:
+                perf.dump_stats(path)
+            except OSError as ex:
+                messagebox.showerror('Save failed', str(ex), parent=self)
 
 
 class MarksManager(tk.Tk):
@@ -131,11 +276,33 @@ class MarksManager(tk.Tk):
 
         # Use portable default path
         self.data_file = DEFAULT_DATA_FILE
-        self.records = read_records(self.data_file)
+        self.records = RecordStore()
+        # While a cohort folder is open: cohort -> the file it came from
+        # (data_file is then the folder), and the cohorts that lost rows to
+        # an earlier cohort at ingest, which are never rewritten from memory
+        self._cohort_paths = {}
+        self._cohort_partial = set()
+
+        # Background file I/O state (see _submit)
+        self._io = None
+        self._jobs = []
+        self._polling = False
+        self._load = None
+        self._pending_journal = []
+        self._pending_path = None
+        self._flush_id = None
+        self._save_id = None
+        self._debug_panel = None
 
         self._build_menu()
         self._build_widgets()
-        self._update_status()
+        self.protocol('WM_DELETE_WINDOW', self._on_close)
+        self.bind('<Escape>', lambda e: self.cancel_load())
+
+    def start(self):
+        """Begin loading the data file; main() calls this once the empty
+        window is on screen."""
+        self._start_load(self.data_file)
 
     # ---------- build UI ----------
     def _build_menu(self):
@@ -149,6 +316,9 @@ class MarksManager(tk.Tk):
         rec_menu.add_separator()
         rec_menu.add_command(label='Top performer', command=self.show_top)
         rec_menu.add_command(label='Lowest performer', command=self.show_bottom)
+        rec_menu.add_command(label='Top / bottom N...', command=self.show_top_n)
+        rec_menu.add_command(label='Statistics report', command=self.show_stats)
+        rec_menu.add_command(label='Percentage range...', command=self.show_pct_range)
         rec_menu.add_separator()
         rec_menu.add_command(label='Sort (A/D)', command=self.sort_by_pct)
         rec_menu.add_command(label='Add record', command=self.add_record)
@@ -161,25 +331,56 @@ class MarksManager(tk.Tk):
         fmenu = tk.Menu(menu, tearoff=0)
         menu.add_cascade(label='File', menu=fmenu)
         fmenu.add_command(label='Open data file...', command=self.open_file_dialog)
-        fmenu.add_command(label='Quit', command=self.quit)
+        fmenu.add_command(label='Save as...', command=self.save_as_dialog)
+        fmenu.add_command(
+            label='Open cohort folder...', command=self.open_cohort_folder
+        )
+        fmenu.add_command(label='Cancel loading', command=self.cancel_load)
+        fmenu.add_command(label='Quit', command=self._on_close)
 
         hmenu = tk.Menu(menu, tearoff=0)
         menu.add_cascade(label='Help', menu=hmenu)
+        self.perf_var = tk.BooleanVar(value=perf.enabled)
+        hmenu.add_checkbutton(
+            label='Instrumentation',
+            variable=self.perf_var,
+            command=lambda: perf.enable(self.perf_var.get()),
+        )
+        hmenu.add_command(label='Debug panel', command=self.show_debug_panel)
+        hmenu.add_command(label='Start profiling', command=self.start_profile)
+        hmenu.add_command(label='Save profile...', command=self.save_profile)
+        hmenu.add_separator()
         hmenu.add_command(label='About', command=self._about)
 
     def _build_widgets(self):
-        self.output = tk.Text(self, wrap='none')
-        self.output.pack(fill='both', expand=True)
+        self.status_var = tk.StringVar()
+        status_label = ttk.Label(self, textvariable=self.status_var, anchor='w')
+        status_label.pack(side='bottom', fill='x')
 
-        xbar = ttk.Scrollbar(self, orient='horizontal', command=self.output.xview)
+        search_bar = ttk.Frame(self)
+        search_bar.pack(side='top', fill='x')
+        ttk.Label(search_bar, text='Search name:').pack(side='left', padx=4, pady=4)
+        self.search_var = tk.StringVar()
+        search = ttk.Entry(search_bar, textvariable=self.search_var, width=40)
+        search.pack(side='left', padx=4, pady=4)
+        search.bind('<KeyRelease>', lambda e: self._type_ahead())
+
+        # Text pane for single-record views and reports
+        self.text_frame = ttk.Frame(self)
+        xbar = ttk.Scrollbar(self.text_frame, orient='horizontal')
         xbar.pack(side='bottom', fill='x')
-        ybar = ttk.Scrollbar(self, orient='vertical', command=self.output.yview)
+        ybar = ttk.Scrollbar(self.text_frame, orient='vertical')
         ybar.pack(side='right', fill='y')
+        self.output = tk.Text(self.text_frame, wrap='none')
+        self.output.pack(fill='both', expand=True)
+        xbar.configure(command=self.output.xview)
+        ybar.configure(command=self.output.yview)
         self.output.configure(xscrollcommand=xbar.set, yscrollcommand=ybar.set)
 
-        self.status_var = tk.StringVar()
-        status_label = ttk.Label(self, textvariable=self.status_var, anchor='w')
-        status_label.pack(side='bottom', fill='x')
+        # Table pane for listings of any size
+        self.table = VirtualTable(self, on_open=self._show_one)
+        self._table_view = None
+        self.text_frame.pack(fill='both', expand=True)
 
     def _update_status(self, msg=None):
         if msg:
@@ -189,76 +390,429 @@ class MarksManager(tk.Tk):
 
     # ---------- display helpers ----------
     def _clear(self):
+        if self._table_view is not None:
+            self.table.pack_forget()
+            self.text_frame.pack(fill='both', expand=True)
+            self._table_view = None
         self.output.delete('1.0', tk.END)
 
+    def _show_table(self, view):
+        """Show the table filled by ``view()``, which is re-run after edits."""
+        if self._table_view is None:
+            self.text_frame.pack_forget()
+            self.table.pack(fill='both', expand=True)
+        self._table_view = view
+        view()
+
+    def _refresh_table(self):
+        if self._table_view is not None:
+            self._table_view()
+
+    def _store_rows(self):
+        """Feed the table from the whole store, sortable by any column."""
+        store = self.records
+
+        def sorter(column, reverse):
+            order = store.order_by(column, reverse)
+            return lambda i: store.row_at(order[i])
+
+        self.table.set_rows(len(store), store.row_at, sorter)
+
+    def _list_rows(self, recs):
+        """Feed the table from a list of records (e.g. query results)."""
+
+        def sorter(column, reverse):
+            recs.sort(key=lambda r: r.get(column, ''), reverse=reverse)
+            return recs.__getitem__
+
+        self.table.set_rows(len(recs), recs.__getitem__, sorter)
+
+    @perf.timed('index.type_ahead')
+    def _type_ahead(self):
+        text = self.search_var.get()
+        if not text.strip():
+            if self._table_view is not None:
+                self.show_all()
+            return
+        recs = self.records.prefix_matches(text, limit=TYPE_AHEAD_LIMIT)
+        self._show_table(lambda: self._list_rows(recs))
+        self._update_status(f'{len(recs)} match(es) for "{text}"')
+
+    @perf.timed('render.print')
     def _print(self, text=''):
         self.output.insert(tk.END, text + '\n')
 
     def _print_record(self, rec):
+        # Records from the store carry cw_total/pct/grade already
+        if 'pct' not in rec:
+            pct = compute_percentage(rec)
+            rec = dict(
+                rec, cw_total=cw_sum(rec), pct=pct, grade=grade_from_percentage(pct)
+            )
         self._print(f"Full name: {rec['fullname']}")
         self._print(f"Student ID: {rec['id']}")
-        self._print(f"Coursework total: {cw_sum(rec)} / 60")
+        if rec.get('cohort'):
+            self._print(f"Cohort: {rec['cohort']}")
+        self._print(f"Coursework total: {rec['cw_total']} / 60")
         self._print(f"Exam: {rec['exam']} / 100")
-        pct = compute_percentage(rec)
-        self._print(f"Overall: {pct:.2f}%")
-        self._print(f"Grade: {grade_from_percentage(pct)}")
+        self._print(f"Overall: {rec['pct']:.2f}%")
+        self._print(f"Grade: {rec['grade']}")
         self._print('')
 
+    # ---------- background I/O ----------
+    # File work runs on a single worker thread, so jobs happen in the order
+    # they were submitted; the Tk thread polls for results with after().
+    def _submit(self, fn, *args, on_done=None, on_error=None):
+        if self._io is None:
+            # Imported here, after the first frame: it pulls in logging
+            import concurrent.futures
+
+            self._io = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        fut = self._io.submit(fn, *args)
+        self._jobs.append((fut, on_done, on_error))
+        if not self._polling:
+            self._polling = True
+            self.after(IO_POLL_MS, self._poll_io)
+        return fut
+
+    def _poll_io(self):
+        if self._load is not None:
+            progress = self._load['progress']
+            rows = f': {progress.rows} rows read' if progress else ''
+            self.status_var.set(f"{self._load['label']}{rows} (Esc to cancel)")
+        jobs, self._jobs = self._jobs, []
+        waiting = []
+        for job in jobs:
+            fut, on_done, on_error = job
+            if not fut.done():
+                waiting.append(job)
+                continue
+            try:
+                result = fut.result()
+            except Exception as ex:
+                if on_error:
+                    on_error(ex)
+                else:
+                    messagebox.showerror('File error', str(ex))
+                    self._update_status()
+                continue
+            if on_done:
+                on_done(result)
+        # Callbacks may have submitted more work
+        self._jobs = waiting + self._jobs
+        if self._jobs:
+            self.after(IO_POLL_MS, self._poll_io)
+        else:
+            self._polling = False
+
+    def _busy(self):
+        """Warn and return True while a load is replacing the records."""
+        if self._load is None:
+            return False
+        messagebox.showinfo('Busy', 'Please wait until loading has finished.')
+        return True
+
+    def _start_load(self, path, on_loaded=None):
+        """Load ``path`` on the worker thread, then swap in the new store."""
+        if self._load is not None and self._load['progress']:
+            self._load['progress'].cancel()
+        self._flush_writes()
+        progress = LoadProgress()
+        load = {'progress': progress, 'label': f'Loading {os.path.basename(path)}'}
+
+        def finish():
+            if self._load is load:
+                self._load = None
+
+        def loaded(store):
+            finish()
+            if load['progress'].cancelled:
+                return
+            self.records = store
+            self._refresh_table()
+            self._update_status()
+            if on_loaded:
+                on_loaded()
+
+        def failed(ex):
+            finish()
+            if isinstance(ex, LoadCancelled):
+                self._update_status('Load cancelled')
+                return
+            messagebox.showerror('Load failed', f'Could not load {path}: {ex}')
+            self._update_status()
+
+        self._load = load
+        self._submit(load_store, path, None, progress, on_done=loaded, on_error=failed)
+
+    def cancel_load(self):
+        if self._load is not None and self._load['progress']:
+            self._load['progress'].cancel()
+
+    def _data_files(self):
+        """The files the records are saved to."""
+        return list(self._cohort_paths.values()) or [self.data_file]
+
+    def _source_file(self, sid):
+        """The file that record ``sid`` is saved to."""
+        if not self._cohort_paths:
+            return self.data_file
+        return self._cohort_paths[self.records.get_id(sid).get('cohort', '')]
+
+    def _journal(self, op, sid, rec=None, path=None):
+        """Queue one mutation for the journal of ``path`` (default: the
+        data file); a burst becomes one write."""
+        path = path or self.data_file
+        if self._pending_journal and self._pending_path != path:
+            self._flush_journal()
+        self._pending_path = path
+        self._pending_journal.append((op, sid, rec))
+        if self._flush_id is None:
+            self._flush_id = self.after(JOURNAL_FLUSH_MS, self._flush_journal)
+        self._refresh_table()
+
+    def _flush_journal(self):
+        if self._flush_id is not None:
+            self.after_cancel(self._flush_id)
+            self._flush_id = None
+        if not self._pending_journal:
+            return
+        entries, self._pending_journal = self._pending_journal, []
+        path = self._pending_path
+
+        def written(size):
+            # Fold a long journal back into the data file
+            if size > JOURNAL_COMPACT_BYTES and path in self._data_files():
+                self._schedule_save()
+
+        self._submit(append_journal_many, entries, path, on_done=written)
+
+    def _schedule_save(self):
+        """Rewrite the whole file shortly; repeated calls share one write."""
+        if self._save_id is None:
+            self._save_id = self.after(SAVE_DELAY_MS, self._flush_save)
+
+    def _flush_save(self, notify=False):
+        if self._save_id is not None:
+            self.after_cancel(self._save_id)
+            self._save_id = None
+        path = self.data_file
+        partial = {
+            p for c, p in self._cohort_paths.items() if c in self._cohort_partial
+        }
+        if self._pending_path in partial:
+            # That file is folded from its own journal, which needs them
+            self._flush_journal()
+        elif self._pending_path in self._data_files():
+            # Queued journal entries are already in the full snapshot
+            self._pending_journal = []
+        snapshot = self.records.copy()
+        self._update_status('Saving...')
+
+        def saved(_):
+            self._update_status(f'{len(snapshot)} record(s) saved')
+            if notify:
+                messagebox.showinfo('Saved', f'Data written to {path}')
+
+        if self._cohort_paths:
+            paths = dict(self._cohort_paths)
+            partial = set(self._cohort_partial)
+            self._submit(write_cohorts, snapshot, paths, partial, on_done=saved)
+        else:
+            self._submit(write_records, snapshot, path, on_done=saved)
+
+    def _flush_writes(self):
+        """Send any queued journal entries and pending save to the worker."""
+        self._flush_journal()
+        if self._save_id is not None:
+            self._flush_save()
+
+    def _on_close(self):
+        self.cancel_load()
+        self._flush_writes()
+        if self._io is not None:
+            self._io.shutdown(wait=True)
+        for fut, _, _ in self._jobs:
+            if fut.exception() is not None and not isinstance(
+                fut.exception(), LoadCancelled
+            ):
+                messagebox.showerror('File error', str(fut.exception()))
+        self.destroy()
+
     # ---------- file/menu actions ----------
     def reload_from_disk(self):
-        self.records = read_records(self.data_file)
-        self._update_status('Data reloaded from disk')
-        messagebox.showinfo('Reload', 'Records reloaded from file.')
+        if self._cohort_paths:
+            self._load_cohorts(self.data_file)
+            return
+        self._start_load(
+            self.data_file,
+            on_loaded=lambda: messagebox.showinfo(
+                'Reload', 'Records reloaded from file.'
+            ),
+        )
 
     def save_to_disk(self):
-        write_records(self.records, self.data_file)
-        self._update_status('Records saved to disk')
-        messagebox.showinfo('Saved', f'Data written to {self.data_file}')
+        if self._busy():
+            return
+        self._flush_journal()
+        self._flush_save(notify=True)
 
     def open_file_dialog(self):
-        path = filedialog.askopenfilename(
+        path = self._dialog(
+            filedialog.askopenfilename,
             title='Open data file',
-            filetypes=[('Text', '*.txt'), ('CSV', '*.csv'), ('All', '*.*')],
+            filetypes=DATA_FILETYPES,
         )
         if path:
+            self._flush_writes()
             self.data_file = path
+            self._cohort_paths = {}
             self.reload_from_disk()
 
+    def open_cohort_folder(self):
+        """Load every marks file in a folder in parallel, one cohort each."""
+        directory = self._dialog(filedialog.askdirectory, title='Open cohort folder')
+        if directory and not self._busy():
+            self._load_cohorts(directory)
+
+    def _load_cohorts(self, directory):
+        paths = cohort_files(directory)
+        if not paths:
+            messagebox.showinfo('Cohorts', 'No marks files found in that folder')
+            return
+        self._flush_writes()
+        load = {'progress': None, 'label': f'Loading {len(paths)} cohort file(s)'}
+        self._load = load
+
+        def loaded(result):
+            self._load = None
+            self.records, report = result
+            # Edits and saves go back to the file each row came from
+            self.data_file = directory
+            self._cohort_paths = {
+                e['cohort']: e['path'] for e in report if 'failed' not in e
+            }
+            self._cohort_partial = {e['cohort'] for e in report if e.get('duplicates')}
+            self._show_cohort_report(report)
+            self._update_status(
+                f'{len(self.records)} record(s) from {len(paths)} cohort(s)'
+            )
+
+        def failed(ex):
+            self._load = None
+            messagebox.showerror('Cohorts', f'Could not load cohorts: {ex}')
+            self._update_status()
+
+        self._submit(ingest_cohorts, paths, on_done=loaded, on_error=failed)
+
+    def _show_cohort_report(self, report):
+        self._clear()
+        self._print('--- Cohort load ---')
+        for entry in report:
+            if 'failed' in entry:
+                self._print(f"{entry['cohort']}: FAILED - {entry['failed']}")
+                continue
+            self._print(
+                f"{entry['cohort']}: {entry['rows']} rows, "
+                f"{entry['rows_per_sec']:.0f} rows/sec, "
+                f"{entry['error_count']} bad row(s), "
+                f"{entry['duplicates']} duplicate ID(s)"
+            )
+            for line, msg in entry['errors']:
+                self._print(f'    line {line}: {msg}')
+        self._print('')
+        self._print(f'Total: {len(self.records)} record(s)')
+
+    def save_as_dialog(self):
+        """Write the records to a new file, converting text <-> snapshot."""
+        path = self._dialog(
+            filedialog.asksaveasfilename,
+            title='Save data file as',
+            filetypes=DATA_FILETYPES,
+            defaultextension='.txt',
+        )
+        if path and not self._busy():
+            self._flush_writes()
+            self.data_file = path
+            self._cohort_paths = {}
+            self.save_to_disk()
+
+    # ---------- instrumentation ----------
+    def _dialog(self, ask, *args, **kwargs):
+        """Show a standard dialog, timing the round trip by its title."""
+        title = kwargs.get('title') or (args[0] if args else ask.__name__)
+        with perf.span(f'dialog.{title}'):
+            return ask(*args, **kwargs)
+
+    def _wait_dialog(self, dlg):
+        with perf.span(f'dialog.{dlg.title()}'):
+            self.wait_window(dlg)
+
+    def show_debug_panel(self):
+        if self._debug_panel is not None and self._debug_panel.winfo_exists():
+            self._debug_panel.lift()
+            return
+        self._debug_panel = DebugPanel(self)
+
+    def start_profile(self):
+        if perf.profiling():
+            messagebox.showinfo('Profiling', 'Already profiling.')
+            return
+        perf.start_profile()
+        self._update_status('Profiling... use Help > Save profile... to stop')
+
+    def save_profile(self):
+        if not perf.profiling():
+            messagebox.showinfo('Profiling', 'Use Help > Start profiling first.')
+            return
+        path = self._dialog(
+            filedialog.asksaveasfilename,
+            title='Save profile',
+            filetypes=[('cProfile data', '*.prof')],
+            defaultextension='.prof',
+        )
+        if path:
+            try:
+                perf.stop_profile(path)
+            except OSError as ex:
+                messagebox.showerror('Profiling', str(ex))
+                return
+            self._update_status(f'Profile saved to {path}')
+
     def _about(self):
         messagebox.showinfo(
             'About', 'Marks Manager - refactored student manager example'
         )
 
     # ---------- operations ----------
+    @perf.timed('index.find_id')
     def _find_by_id(self, sid):
-        for r in self.records:
-            if r['id'] == sid:
-                return r
-        return None
+        return self.records.get_id(sid)
 
+    @perf.timed('index.find_name')
     def _find_by_name(self, fragment):
-        return [r for r in self.records if fragment.lower() in r['fullname'].lower()]
+        return self.records.find_name(fragment)
 
+    @perf.timed('render.show_all')
     def show_all(self):
         self._clear()
         if not self.records:
             self._print('No records present.')
             return
-        total = 0.0
-        for r in self.records:
-            self._print_record(r)
-            total += compute_percentage(r)
-        avg = total / len(self.records)
-        self._print('--- Summary ---')
-        self._print(f"Count: {len(self.records)}")
-        self._print(f"Average: {avg:.2f}%")
-        self._update_status('Viewing all records')
+        self._show_table(self._store_rows)
+        summary = self.records.summary()
+        self._update_status(
+            f"Viewing all records - Count: {summary['count']}, "
+            f"Average: {summary['average']:.2f}%"
+        )
 
     def show_single(self):
         if not self.records:
             messagebox.showwarning('Empty', 'No data loaded')
             return
-        key = simpledialog.askstring('Find', 'Enter student ID or part of name:')
+        key = self._dialog(
+            simpledialog.askstring, 'Find', 'Enter student ID or part of name:'
+        )
         if not key:
             return
         key = key.strip()
@@ -268,9 +822,7 @@ class MarksManager(tk.Tk):
             if not rec:
                 messagebox.showinfo('Not found', f'No record with ID {sid}')
                 return
-            self._clear()
-            self._print_record(rec)
-            self._update_status(f'Viewing {rec["id"]}')
+            self._show_one(rec)
             return
         except ValueError:
             matches = self._find_by_name(key)
@@ -278,19 +830,22 @@ class MarksManager(tk.Tk):
                 messagebox.showinfo('Not found', 'No matching names')
                 return
             if len(matches) == 1:
-                self._clear()
-                self._print_record(matches[0])
-                self._update_status(f'Viewing {matches[0]["id"]}')
+                self._show_one(matches[0])
                 return
             sel = self._choose(matches, title='Choose record')
             if sel is None:
                 return
-            rec = matches[sel]
-            self._clear()
-            self._print_record(rec)
-            self._update_status(f'Viewing {rec["id"]}')
+            self._show_one(matches[sel])
 
-    def _choose(self, items, title='Choose'):
+    def _show_one(self, rec):
+        self._clear()
+        self._print_record(rec)
+        rank = self.records.percentile_rank(rec['id'])
+        if rank is not None:
+            self._print(f"Percentile rank: {rank:.1f}")
+        self._update_status(f'Viewing {rec["id"]}')
+
+    def _choose(self, items, title='Choose', label=None):
         dlg = tk.Toplevel(self)
         dlg.title(title)
         dlg.grab_set()
@@ -298,7 +853,8 @@ class MarksManager(tk.Tk):
         lb = tk.Listbox(dlg, width=60, height=10)
         lb.pack(padx=8, pady=6)
         for it in items:
-            lb.insert(tk.END, f"{it['id']} - {it['fullname']}")
+            text = label(it) if label else f"{it['id']} - {it['fullname']}"
+            lb.insert(tk.END, text)
         res = {'idx': None}
 
         def ok():
@@ -316,14 +872,14 @@ class MarksManager(tk.Tk):
         btnf.pack(pady=6)
         ttk.Button(btnf, text='OK', command=ok).pack(side='left', padx=4)
         ttk.Button(btnf, text='Cancel', command=cancel).pack(side='left', padx=4)
-        self.wait_window(dlg)
+        self._wait_dialog(dlg)
         return res['idx']
 
     def show_top(self):
         if not self.records:
             messagebox.showwarning('Empty', 'No data loaded')
             return
-        best = max(self.records, key=lambda r: compute_percentage(r))
+        best = self.records.summary()['best']
         self._clear()
         self._print('--- Top performer ---')
         self._print_record(best)
@@ -333,18 +889,96 @@ class MarksManager(tk.Tk):
         if not self.records:
             messagebox.showwarning('Empty', 'No data loaded')
             return
-        worst = min(self.records, key=lambda r: compute_percentage(r))
+        worst = self.records.summary()['worst']
         self._clear()
         self._print('--- Lowest performer ---')
         self._print_record(worst)
         self._update_status(f'Lowest: {worst["id"]} - {worst["fullname"]}')
 
+    def show_stats(self):
+        if not self.records:
+            messagebox.showwarning('Empty', 'No data loaded')
+            return
+        stats = cohort_stats(self.records)
+        self._clear()
+        self._print('--- Cohort statistics ---')
+        self._print(f"Students: {stats['count']}")
+        self._print()
+        self._print(
+            f"{'':<10}{'mean':>8}{'stdev':>8}{'min':>8}{'Q1':>8}"
+            f"{'median':>8}{'Q3':>8}{'max':>8}"
+        )
+        rows = [('overall %', stats['overall'])]
+        rows += list(stats['components'].items())
+        for label, d in rows:
+            if not d['count']:
+                continue
+            self._print(
+                f"{label:<10}{d['mean']:>8.2f}{d['stdev']:>8.2f}{d['min']:>8.2f}"
+                f"{d['q1']:>8.2f}{d['median']:>8.2f}{d['q3']:>8.2f}{d['max']:>8.2f}"
+            )
+        self._print()
+        self._print('Grade distribution:')
+        count = stats['count'] or 1
+        for grade, g in stats['grades'].items():
+            share = g['count'] / count
+            bar = '#' * round(share * 40)
+            self._print(
+                f"  {grade} (>= {g['from_pct']:>2}%) {g['count']:>8} "
+                f"{share:>7.1%}  {bar}"
+            )
+        if stats['correlations']:
+            self._print()
+            self._print('Correlations (Pearson r):')
+            for pair, r in stats['correlations'].items():
+                self._print(f"  {pair:<16}{r:>7.3f}")
+        self._update_status(f"Statistics for {stats['count']} record(s)")
+
+    def show_top_n(self):
+        if not self.records:
+            messagebox.showwarning('Empty', 'No data loaded')
+            return
+        n = self._dialog(
+            simpledialog.askinteger,
+            'Top / bottom N',
+            'How many students? (negative for the lowest)',
+            initialvalue=10,
+        )
+        if not n:
+            return
+        if n > 0:
+            title, recs = f'Top {n}', self.records.top(n)
+        else:
+            title, recs = f'Bottom {-n}', self.records.bottom(-n)
+        self._show_table(lambda: self._list_rows(recs))
+        self._update_status(f'{title}: {len(recs)} record(s) shown')
+
+    def show_pct_range(self):
+        if not self.records:
+            messagebox.showwarning('Empty', 'No data loaded')
+            return
+        text = self._dialog(
+            simpledialog.askstring,
+            'Percentage range',
+            'Enter low and high percentage, e.g. 40-50:',
+        )
+        if not text:
+            return
+        try:
+            low, high = (float(x) for x in text.split('-', 1))
+        except ValueError:
+            messagebox.showerror('Bad', 'Enter two numbers like 40-50')
+            return
+        recs = self.records.pct_range(low, high)
+        self._show_table(lambda: self._list_rows(recs))
+        self._update_status(f'{len(recs)} record(s) between {low:g}% and {high:g}%')
+
     def sort_by_pct(self):
         if not self.records:
             messagebox.showwarning('Empty', 'No data loaded')
             return
-        choice = simpledialog.askstring(
-            'Sort', 'Enter A for ascending or D for descending:'
+        choice = self._dialog(
+            simpledialog.askstring, 'Sort', 'Enter A for ascending or D for descending:'
         )
         if not choice:
             return
@@ -353,29 +987,41 @@ class MarksManager(tk.Tk):
             messagebox.showerror('Bad', 'Enter A or D')
             return
         rev = c == 'D'
-        self.records.sort(key=lambda r: compute_percentage(r), reverse=rev)
+        self.records.sort_by_percentage(reverse=rev)
         self.show_all()
         self._update_status(f'Sorted ({"desc" if rev else "asc"})')
 
     def add_record(self):
+        if self._busy():
+            return
         dlg = RecordEditor(self, title='Add record')
-        self.wait_window(dlg)
+        self._wait_dialog(dlg)
         if dlg.result:
             new = dlg.result
-            if any(r['id'] == new['id'] for r in self.records):
+            if new['id'] in self.records:
                 messagebox.showerror('Duplicate', 'ID already exists')
                 return
+            if self._cohort_paths:
+                cohorts = sorted(self._cohort_paths)
+                sel = self._choose(cohorts, title='Add to cohort', label=str)
+                if sel is None:
+                    return
+                new['cohort'] = cohorts[sel]
             self.records.append(new)
-            write_records(self.records, self.data_file)
+            self._journal('add', new['id'], new, self._source_file(new['id']))
             self._update_status(f'Record {new["id"]} added')
             messagebox.showinfo('Added', 'Record added and saved')
 
     def remove_record(self):
+        if self._busy():
+            return
         if not self.records:
             messagebox.showwarning('Empty', 'No data loaded')
             return
-        key = simpledialog.askstring(
-            'Remove', 'Enter student ID or part of name to remove:'
+        key = self._dialog(
+            simpledialog.askstring,
+            'Remove',
+            'Enter student ID or part of name to remove:',
         )
         if not key:
             return
@@ -386,13 +1032,12 @@ class MarksManager(tk.Tk):
             if not rec:
                 messagebox.showinfo('Not found', f'No record with ID {sid}')
                 return
-            if messagebox.askyesno(
-                'Confirm', f'Remove {rec["id"]} - {rec["fullname"]}?'
+            if self._dialog(
+                messagebox.askyesno,
+                'Confirm',
+                f'Remove {rec["id"]} - {rec["fullname"]}?',
             ):
-                self.records = [r for r in self.records if r['id'] != sid]
-                write_records(self.records, self.data_file)
-                self._update_status(f'Record {sid} removed')
-                messagebox.showinfo('Removed', 'Record removed and saved')
+                self._remove(sid)
             return
         except ValueError:
             matches = self._find_by_name(key)
@@ -401,34 +1046,50 @@ class MarksManager(tk.Tk):
                 return
             if len(matches) == 1:
                 rec = matches[0]
-                if messagebox.askyesno(
-                    'Confirm', f'Remove {rec["id"]} - {rec["fullname"]}?'
+                if self._dialog(
+                    messagebox.askyesno,
+                    'Confirm',
+                    f'Remove {rec["id"]} - {rec["fullname"]}?',
                 ):
-                    self.records = [
-                        r for r in self.records if r['id'] != rec['id']
-                    ]
-                    write_records(self.records, self.data_file)
-                    self._update_status(f'Record {rec["id"]} removed')
-                    messagebox.showinfo('Removed', 'Record removed and saved')
+                    self._remove(rec['id'])
                 return
             sel = self._choose(matches, title='Choose to remove')
             if sel is None:
                 return
             rec = matches[sel]
-            if messagebox.askyesno(
-                'Confirm', f'Remove {rec["id"]} - {rec["fullname"]}?'
+            if self._dialog(
+                messagebox.askyesno,
+                'Confirm',
+                f'Remove {rec["id"]} - {rec["fullname"]}?',
             ):
-                self.records = [r for r in self.records if r['id'] != rec['id']]
-                write_records(self.records, self.data_file)
-                self._update_status(f'Record {rec["id"]} removed')
-                messagebox.showinfo('Removed', 'Record removed and saved')
+                self._remove(rec['id'])
+
+    def _remove(self, sid):
+        path = self._source_file(sid)
+        self.records.remove_id(sid)
+        self._journal('del', sid, path=path)
+        self._update_status(f'Record {sid} removed')
+        messagebox.showinfo('Removed', 'Record removed and saved')
+
+    def _apply_edit(self, old_id, new):
+        path = self._source_file(old_id)
+        try:
+            self.records.replace_id(old_id, new)
+        except ValueError as ex:
+            messagebox.showerror('Duplicate', str(ex))
+            return
+        self._journal('edit', old_id, new, path)
+        self._update_status(f'Record {new["id"]} updated')
+        messagebox.showinfo('Updated', 'Record updated and saved')
 
     def edit_record(self):
+        if self._busy():
+            return
         if not self.records:
             messagebox.showwarning('Empty', 'No data loaded')
             return
-        key = simpledialog.askstring(
-            'Edit', 'Enter student ID or part of name to edit:'
+        key = self._dialog(
+            simpledialog.askstring, 'Edit', 'Enter student ID or part of name to edit:'
         )
         if not key:
             return
@@ -440,16 +1101,9 @@ class MarksManager(tk.Tk):
                 messagebox.showinfo('Not found', f'No record with ID {sid}')
                 return
             dlg = RecordEditor(self, student=rec, title='Edit record')
-            self.wait_window(dlg)
+            self._wait_dialog(dlg)
             if dlg.result:
-                new = dlg.result
-                for i, r in enumerate(self.records):
-                    if r['id'] == sid:
-                        self.records[i] = new
-                        break
-                write_records(self.records, self.data_file)
-                self._update_status(f'Record {new["id"]} updated')
-                messagebox.showinfo('Updated', 'Record updated and saved')
+                self._apply_edit(sid, dlg.result)
             return
         except ValueError:
             matches = self._find_by_name(key)
@@ -459,32 +1113,18 @@ class MarksManager(tk.Tk):
             if len(matches) == 1:
                 rec = matches[0]
                 dlg = RecordEditor(self, student=rec, title='Edit record')
-                self.wait_window(dlg)
+                self._wait_dialog(dlg)
                 if dlg.result:
-                    new = dlg.result
-                    for i, r in enumerate(self.records):
-                        if r['id'] == rec['id']:
-                            self.records[i] = new
-                            break
-                    write_records(self.records, self.data_file)
-                    self._update_status(f'Record {new["id"]} updated')
-                    messagebox.showinfo('Updated', 'Record updated and saved')
+                    self._apply_edit(rec['id'], dlg.result)
                 return
             sel = self._choose(matches, title='Choose to edit')
             if sel is None:
                 return
             rec = matches[sel]
             dlg = RecordEditor(self, student=rec, title='Edit record')
-            self.wait_window(dlg)
+            self._wait_dialog(dlg)
             if dlg.result:
-                new = dlg.result
-                for i, r in enumerate(self.records):
-                    if r['id'] == rec['id']:
-                        self.records[i] = new
-                        break
-                write_records(self.records, self.data_file)
-                self._update_status(f'Record {new["id"]} updated')
-                messagebox.showinfo('Updated', 'Record updated and saved')
+                self._apply_edit(rec['id'], dlg.result)
 
 
 class RecordEditor(tk.Toplevel):
@@ -549,29 +1189,14 @@ class RecordEditor(tk.Toplevel):
 
     def _on_ok(self):
         try:
-            sid = int(self.f_id.get())
-            if not (1000 <= sid <= 9999):
-                raise ValueError('ID must be between 1000 and 9999')
-            name = self.f_name.get().strip()
-            if not name:
-                raise ValueError('Name required')
-            cw1 = int(self.f_cw1.get())
-            cw2 = int(self.f_cw2.get())
-            cw3 = int(self.f_cw3.get())
-            for cw in (cw1, cw2, cw3):
-                if not (0 <= cw <= 20):
-                    raise ValueError('Coursework marks must be 0-20')
-            exam = int(self.f_exam.get())
-            if not (0 <= exam <= 100):
-                raise ValueError('Exam must be 0-100')
-            self.result = {
-                'id': sid,
-                'fullname': name,
-                'cw_a': cw1,
-                'cw_b': cw2,
-                'cw_c': cw3,
-                'exam': exam,
-            }
+            self.result = validate_record(
+                self.f_id.get(),
+                self.f_name.get(),
+                self.f_cw1.get(),
+                self.f_cw2.get(),
+                self.f_cw3.get(),
+                self.f_exam.get(),
+            )
             self.destroy()
         except ValueError as ex:
             messagebox.showerror('Invalid', f'Invalid input: {ex}')
@@ -580,6 +1205,16 @@ class RecordEditor(tk.Toplevel):
         self.destroy()
 
 
-if __name__ == '__main__':
+def main():
+    started = time.perf_counter()
     app = MarksManager()
+    # Show the window before reading any data
+    if perf.first_frame(app, started):
+        app.destroy()
+        return
+    app.start()
     app.mainloop()
+
+
+if __name__ == '__main__':
+    main()
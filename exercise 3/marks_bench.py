@@ -0,0 +1,422 @@
+"""Benchmarks for the Marks Manager data layer.
+
+Run from this folder, e.g.:
+
+    python -m marks_bench                          # 10^3, 10^4, 10^5 rows
+    python -m marks_bench --rows 1000 10000000 -o after.json
+    python -m marks_bench --compare before.json    # flag regressions
+
+Input files are synthetic studentMarks.txt-style files (count line, then
+id,name,cw_a,cw_b,cw_c,exam) generated from a fixed seed and cached in a
+temp folder, so runs on different commits time exactly the same data.
+
+Every case reports wall time over --repeat runs (min/median), rows or
+operations per second, latency percentiles for per-lookup cases, and the
+peak Python heap used (tracemalloc, measured in a separate untimed run).
+Results are written as JSON together with the commit they were taken on.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+from marks_data import (
+    RecordStore,
+    cohort_stats,
+    load_numpy,
+    load_store,
+    read_records,
+    write_records,
+)
+
+SCHEMA = 1
+SEED = 20240501
+# Bump when generate_file changes, so cached inputs are rebuilt
+GENERATOR_VERSION = 1
+DEFAULT_ROWS = (10**3, 10**4, 10**5)
+LOOKUPS = 2000
+SEARCHES = 200
+PAGE_ROWS = 40
+
+FIRST_NAMES = (
+    'Aisha', 'Ben', 'Chloe', 'Daniel', 'Ella', 'Farah', 'George', 'Hannah',
+    'Ibrahim', 'Jack', 'Katie', 'Liam', 'Maya', 'Nabeel', 'Olivia', 'Priya',
+    'Qasim', 'Ruby', 'Sameer', 'Tom', 'Usman', 'Victoria', 'William', 'Xin',
+    'Yusuf', 'Zara', 'Amelia', 'Oscar', 'Isla', 'Harry', 'Sophie', 'Mohammed',
+    'Grace', 'Noah', 'Freya', 'Leo', 'Emily', 'Arjun', 'Lily', 'Hebtan',
+)
+LAST_NAMES = (
+    'Smith', 'Jones', 'Taylor', 'Brown', 'Williams', 'Wilson', 'Johnson',
+    'Davies', 'Patel', 'Robinson', 'Wright', 'Thompson', 'Evans', 'Walker',
+    'White', 'Roberts', 'Green', 'Hall', 'Khan', 'Ahmed', 'Ali', 'Hussain',
+    'Clarke', 'Lewis', 'Jackson', 'Wood', 'Turner', 'Martin', 'Cooper',
+    'Hill', 'Ward', 'Morris', 'Moore', 'Clark', 'Lee', 'King', 'Baker',
+    'Harrison', 'Curry', 'Sturtivant', 'Nguyen', 'Chen', 'Kowalski', 'Murphy',
+)
+
+
+# ----------------- Synthetic data -----------------
+
+
+def _clip(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+def generate_rows(rows, seed=SEED):
+    """Yield ``rows`` CSV lines with unique IDs and plausible marks.
+
+    Each student gets an ability score so coursework and exam marks are
+    correlated, as in real cohorts; marks are clipped to their ranges.
+    """
+    rnd = random.Random(seed)
+    gauss = rnd.gauss
+    for i in range(rows):
+        name = f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}'
+        ability = gauss(0, 1)
+        cw = [
+            _clip(round(13 + 4 * (0.6 * ability + 0.8 * gauss(0, 1))), 0, 20)
+            for _ in range(3)
+        ]
+        exam = _clip(round(62 + 16 * (0.7 * ability + 0.7 * gauss(0, 1))), 0, 100)
+        yield f'{1000 + i},{name},{cw[0]},{cw[1]},{cw[2]},{exam}\n'
+
+
+def generate_file(path, rows, seed=SEED):
+    """Write a studentMarks.txt-format file with ``rows`` records."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='') as fh:
+        fh.write(f'{rows}\n')
+        lines = generate_rows(rows, seed)
+        while True:
+            chunk = [line for _, line in zip(range(65536), lines)]
+            if not chunk:
+                break
+            fh.writelines(chunk)
+    os.replace(tmp, path)
+
+
+def data_file(rows, seed=SEED, directory=None):
+    """Path of the cached input file for ``rows``, generating it if needed."""
+    directory = directory or os.path.join(tempfile.gettempdir(), 'marks_bench')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'marks_v{GENERATOR_VERSION}_{rows}_{seed}.txt')
+    if not os.path.exists(path):
+        log(f'generating {rows} rows -> {path}')
+        generate_file(path, rows, seed)
+    return path
+
+
+# ----------------- Measurement -----------------
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Case:
+    """One benchmark: ``setup()`` builds untimed state, ``run(state)`` is
+    timed. With ``per_op`` the case is a batch of lookups and ``run``
+    returns the latency of each one (seconds) for the percentiles."""
+
+    def __init__(self, group, name, run, setup=None, work=None, per_op=False):
+        self.group = group
+        self.name = name
+        self.run = run
+        self.per_op = per_op
+        self.setup = setup or (lambda: None)
+        # Units processed per run, for the throughput figure
+        self.work = work
+
+    def measure(self, repeat, memory):
+        times, latencies = [], []
+        for _ in range(repeat):
+            state = self.setup()
+            start = time.perf_counter()
+            ops = self.run(state)
+            times.append(time.perf_counter() - start)
+            if self.per_op:
+                latencies.extend(ops)
+        times.sort()
+        median = _percentile(times, 50)
+        result = {
+            'group': self.group,
+            'case': self.name,
+            'seconds': {'min': times[0], 'median': median, 'max': times[-1]},
+        }
+        if self.work and median:
+            result['per_sec'] = self.work / median
+        if latencies:
+            latencies.sort()
+            result['latency_us'] = {
+                f'p{p}': _percentile(latencies, p) * 1e6 for p in (50, 90, 99)
+            }
+            result['latency_us']['max'] = latencies[-1] * 1e6
+        if memory:
+            state = self.setup()
+            tracemalloc.start()
+            try:
+                self.run(state)
+                result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        return result
+
+
+def _timed_each(fn, args):
+    clock = time.perf_counter
+    latencies = []
+    for arg in args:
+        start = clock()
+        fn(arg)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def build_cases(path, rows, workdir, seed=SEED):
+    """The benchmark cases for one input file."""
+    store = load_store(path)
+    rnd = random.Random(seed)
+    # Mostly hits with some misses, like a user typing IDs
+    ids = [1000 + rnd.randrange(rows) for _ in range(LOOKUPS)]
+    ids[::10] = [1000 + rows + rnd.randrange(rows) for _ in ids[::10]]
+    names = store.names()
+    fragments = []
+    for _ in range(SEARCHES):
+        name = rnd.choice(names)
+        start = rnd.randrange(max(1, len(name) - 3))
+        fragments.append(name[start:start + 3 + rnd.randrange(3)])
+    prefixes = [rnd.choice(names)[: 1 + rnd.randrange(4)] for _ in range(SEARCHES)]
+    store.prefix_matches('')  # builds the name index outside the timed cases
+    text_out = os.path.join(workdir, 'out.txt')
+    snap_out = os.path.join(workdir, 'out.msnap')
+    write_records(store, snap_out, fsync=False)
+
+    def first_page(s):
+        # What "List all" does: aggregates for the status bar plus the
+        # rows the virtual table actually renders
+        s.summary()
+        for i in range(min(PAGE_ROWS, len(s))):
+            s.row_at(i)
+
+    return [
+        Case('parse', 'read_records', lambda _: read_records(path), work=rows),
+        Case('parse', 'load_store', lambda _: load_store(path), work=rows),
+        Case('parse', 'load_snapshot', lambda _: load_store(snap_out), work=rows),
+        Case(
+            'serialize',
+            'write_text',
+            lambda _: write_records(store, text_out, fsync=False),
+            work=rows,
+        ),
+        Case(
+            'serialize',
+            'write_snapshot',
+            lambda _: write_records(store, snap_out, fsync=False),
+            work=rows,
+        ),
+        Case(
+            'lookup',
+            'find_by_id',
+            lambda _: _timed_each(store.get_id, ids),
+            work=len(ids),
+            per_op=True,
+        ),
+        Case(
+            'search',
+            'index_build',
+            lambda s: s.prefix_matches(''),
+            setup=lambda: RecordStore.from_columns(
+                {f: store.column(f) for f in ('id', 'cw_a', 'cw_b', 'cw_c', 'exam')},
+                names,
+            ),
+            work=rows,
+        ),
+        Case(
+            'search',
+            'find_by_name',
+            lambda _: _timed_each(store.find_name, fragments),
+            work=len(fragments),
+            per_op=True,
+        ),
+        Case(
+            'search',
+            'prefix_matches',
+            lambda _: _timed_each(lambda t: store.prefix_matches(t, 200), prefixes),
+            work=len(prefixes),
+            per_op=True,
+        ),
+        Case(
+            'sort',
+            'sort_by_pct',
+            lambda s: s.sort_by_percentage(reverse=True),
+            setup=store.copy,
+            work=rows,
+        ),
+        Case(
+            'sort',
+            'order_by_name',
+            lambda s: s.order_by('fullname'),
+            setup=store.copy,
+            work=rows,
+        ),
+        Case('aggregate', 'show_all', lambda _: first_page(store)),
+        Case('aggregate', 'cohort_stats', lambda _: cohort_stats(store), work=rows),
+    ]
+
+
+# ----------------- Report -----------------
+
+
+def _git(*args):
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        out = subprocess.run(
+            ['git', *args], cwd=here, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def environment(seed):
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': load_numpy().__version__ if load_numpy() else None,
+        'seed': seed,
+        'generator_version': GENERATOR_VERSION,
+    }
+
+
+def _max_rss_bytes():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def run(rows_list, repeat=3, memory=True, only=None, seed=SEED, datadir=None):
+    results = []
+    with tempfile.TemporaryDirectory(prefix='marks_bench_') as workdir:
+        for rows in rows_list:
+            path = data_file(rows, seed, datadir)
+            for case in build_cases(path, rows, workdir, seed):
+                if only and case.group not in only and case.name not in only:
+                    continue
+                log(f'{rows:>10} {case.group}/{case.name}')
+                result = case.measure(repeat, memory)
+                result['rows'] = rows
+                results.append(result)
+    return {
+        'schema': SCHEMA,
+        'meta': environment(seed),
+        'results': results,
+        'max_rss_bytes': _max_rss_bytes(),
+    }
+
+
+def compare(base, current, threshold):
+    """Print changes in best-of-repeat time against ``base`` (less noisy
+    than the median on a busy machine); return the regressions."""
+    before = {(r['rows'], r['case']): r for r in base['results']}
+    regressions = []
+    log(f"{'rows':>10} {'case':<16}{'before':>11}{'after':>11}{'change':>9}")
+    for r in current['results']:
+        old = before.get((r['rows'], r['case']))
+        if old is None:
+            continue
+        t0, t1 = old['seconds']['min'], r['seconds']['min']
+        change = (t1 - t0) / t0 if t0 else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(r)
+        log(
+            f"{r['rows']:>10} {r['case']:<16}{t0 * 1e3:>9.2f}ms{t1 * 1e3:>9.2f}ms"
+            f"{change:>+9.1%}{flag}"
+        )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='marks_bench', description='Benchmark the marks data layer.'
+    )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        nargs='+',
+        default=list(DEFAULT_ROWS),
+        help='input sizes (default: %(default)s)',
+    )
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument(
+        '--only', nargs='+', help='run only these groups or cases, e.g. parse sort'
+    )
+    parser.add_argument(
+        '--no-memory', action='store_true', help='skip the tracemalloc runs'
+    )
+    parser.add_argument('--datadir', help='where generated inputs are cached')
+    parser.add_argument('-o', '--output', help='write JSON here instead of stdout')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.10,
+        help='slowdown that counts as a regression (default: %(default)s)',
+    )
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.rows,
+        repeat=max(1, args.repeat),
+        memory=not args.no_memory,
+        only=set(args.only or ()),
+        seed=args.seed,
+        datadir=args.datadir,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as fh:
+            base = json.load(fh)
+        if compare(base, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
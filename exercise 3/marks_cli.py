@@ -0,0 +1,302 @@
+"""Command-line Marks Manager for scripts, cron jobs and headless servers.
+
+Run from this folder, e.g.:
+
+    python -m marks_cli list --sort pct --desc
+    python -m marks_cli --format json top -n 5
+    python -m marks_cli add 1234 "Jane Doe" 12 15 18 71
+
+Records are written to stdout as CSV (default) or JSON, one object per
+line, as they are produced. Only marks_data is imported, never tkinter.
+Only add creates a missing data file; the other commands exit with 1.
+With MARKS_PROFILE=1 the timing counters are printed to stderr at exit.
+"""
+import argparse
+import csv
+import errno
+import json
+import os
+import sys
+
+import marks_perf
+from marks_data import (
+    DEFAULT_DATA_FILE,
+    JOURNAL_COMPACT_BYTES,
+    append_journal,
+    cohort_stats,
+    compute_percentage,
+    convert_records,
+    cw_sum,
+    grade_from_percentage,
+    iter_records,
+    journal_path,
+    load_store,
+    validate_record,
+    write_records,
+)
+
+OUTPUT_FIELDS = ['id', 'fullname', 'cw_total', 'exam', 'pct', 'grade', 'cohort']
+
+
+# ----------------- Output -----------------
+
+
+def _with_derived(rec):
+    """Add cw_total/pct/grade to records that came straight from a file."""
+    if 'pct' in rec:
+        return rec
+    pct = compute_percentage(rec)
+    return dict(rec, cw_total=cw_sum(rec), pct=pct, grade=grade_from_percentage(pct))
+
+
+class RecordWriter:
+    """Write records to a stream as CSV rows or JSON lines."""
+
+    def __init__(self, fmt='csv', out=None):
+        self.fmt = fmt
+        self.out = out or sys.stdout
+        self._csv = None
+
+    def write(self, rec):
+        rec = _with_derived(rec)
+        row = {f: rec.get(f, '') for f in OUTPUT_FIELDS}
+        row['pct'] = round(row['pct'], 2)
+        if self.fmt == 'json':
+            self.out.write(json.dumps(row) + '\n')
+            return
+        if self._csv is None:
+            self._csv = csv.DictWriter(self.out, OUTPUT_FIELDS, lineterminator='\n')
+            self._csv.writeheader()
+        self._csv.writerow(row)
+
+    def write_all(self, records):
+        count = 0
+        for rec in records:
+            self.write(rec)
+            count += 1
+        return count
+
+    def write_value(self, obj):
+        """Write a non-record result (e.g. stats) as JSON or key,value CSV."""
+        if self.fmt == 'json':
+            self.out.write(json.dumps(obj) + '\n')
+            return
+        writer = csv.writer(self.out, lineterminator='\n')
+        for key, value in _flatten(obj):
+            writer.writerow([key, value])
+
+
+def _flatten(obj, prefix=''):
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from _flatten(value, f'{prefix}{key}.')
+    elif isinstance(obj, (list, tuple)):
+        for i, value in enumerate(obj):
+            yield from _flatten(value, f'{prefix}{i}.')
+    else:
+        yield prefix.rstrip('.'), obj
+
+
+# ----------------- Commands -----------------
+
+
+def _existing(path):
+    """Return ``path``, or raise FileNotFoundError if it is missing.
+
+    iter_records would create a missing file, which only add should do.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(errno.ENOENT, 'No such data file', path)
+    return path
+
+
+def _journal(store, op, sid, rec, path):
+    """Journal a change already made to ``store``; a long journal is
+    folded back into the data file, as the GUI does."""
+    if append_journal(op, sid, rec, path) > JOURNAL_COMPACT_BYTES:
+        write_records(store, path)
+
+
+def _streamable(path):
+    # Without a journal the file itself is the truth and can be streamed
+    return not os.path.exists(journal_path(path))
+
+
+def cmd_list(args, out):
+    path = _existing(args.file)
+    if args.sort is None and _streamable(path):
+        out.write_all(iter_records(path))
+        return 0
+    store = load_store(path)
+    if args.sort is None:
+        out.write_all(store)
+    else:
+        order = store.order_by(args.sort, reverse=args.desc)
+        out.write_all(store.row_at(i) for i in order)
+    return 0
+
+
+def cmd_find(args, out):
+    store = load_store(_existing(args.file))
+    try:
+        rec = store.get_id(int(args.query))
+        matches = [rec] if rec else []
+    except ValueError:
+        matches = store.find_name(args.query)
+    out.write_all(matches)
+    return 0 if matches else 1
+
+
+def cmd_top(args, out):
+    out.write_all(load_store(_existing(args.file)).top(args.n))
+    return 0
+
+
+def cmd_bottom(args, out):
+    out.write_all(load_store(_existing(args.file)).bottom(args.n))
+    return 0
+
+
+def cmd_sort(args, out):
+    store = load_store(_existing(args.file))
+    store.sort_by_percentage(reverse=args.desc)
+    if args.save:
+        write_records(store, args.file)
+    out.write_all(store)
+    return 0
+
+
+def cmd_stats(args, out):
+    store = load_store(_existing(args.file))
+    summary = store.summary()
+    for key in ('best', 'worst'):
+        if summary[key] is not None:
+            summary[key] = summary[key]['id']
+    if args.full:
+        summary['full'] = cohort_stats(store)
+    out.write_value(summary)
+    return 0
+
+
+def cmd_add(args, out):
+    try:
+        rec = validate_record(
+            args.id, args.name, args.cw_a, args.cw_b, args.cw_c, args.exam
+        )
+    except ValueError as ex:
+        print(f'Invalid input: {ex}', file=sys.stderr)
+        return 2
+    store = load_store(args.file)
+    if rec['id'] in store:
+        print(f"ID {rec['id']} already exists", file=sys.stderr)
+        return 1
+    store.append(rec)
+    _journal(store, 'add', rec['id'], rec, args.file)
+    out.write(rec)
+    return 0
+
+
+def cmd_remove(args, out):
+    store = load_store(_existing(args.file))
+    rec = store.get_id(args.id)
+    if rec is None:
+        print(f'No record with ID {args.id}', file=sys.stderr)
+        return 1
+    store.remove_id(args.id)
+    _journal(store, 'del', args.id, None, args.file)
+    out.write(rec)
+    return 0
+
+
+def cmd_convert(args, out):
+    convert_records(_existing(args.src), args.dst)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='marks_cli', description='Headless student marks analytics.'
+    )
+    parser.add_argument(
+        '--file', default=DEFAULT_DATA_FILE, help='data file (text or .msnap)'
+    )
+    parser.add_argument(
+        '--format', choices=('csv', 'json'), default='csv', help='output format'
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('list', help='all records')
+    p.add_argument(
+        '--sort', choices=('id', 'fullname', 'cw_total', 'exam', 'pct', 'grade')
+    )
+    p.add_argument('--desc', action='store_true')
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser('find', help='record by ID or part of a name')
+    p.add_argument('query')
+    p.set_defaults(func=cmd_find)
+
+    for name, func, what in (
+        ('top', cmd_top, 'highest'),
+        ('bottom', cmd_bottom, 'lowest'),
+    ):
+        p = sub.add_parser(name, help=f'students with the {what} percentage')
+        p.add_argument('-n', type=int, default=1)
+        p.set_defaults(func=func)
+
+    p = sub.add_parser('sort', help='records by percentage')
+    p.add_argument('--desc', action='store_true')
+    p.add_argument('--save', action='store_true', help='write the order back')
+    p.set_defaults(func=cmd_sort)
+
+    p = sub.add_parser('stats', help='cohort summary')
+    p.add_argument(
+        '--full',
+        action='store_true',
+        help='add distributions, grade bands and correlations under "full"',
+    )
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser('add', help='add a student record')
+    for field in ('id', 'name', 'cw_a', 'cw_b', 'cw_c', 'exam'):
+        p.add_argument(field)
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser('remove', help='delete a student record')
+    p.add_argument('id', type=int)
+    p.set_defaults(func=cmd_remove)
+
+    p = sub.add_parser('convert', help='copy data between text and .msnap')
+    p.add_argument('src')
+    p.add_argument('dst')
+    p.set_defaults(func=cmd_convert)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = RecordWriter(args.format)
+    try:
+        return args.func(args, out)
+    except BrokenPipeError:
+        # e.g. piped into head; nothing more to write
+        return 0
+    except OSError as ex:
+        print(f'Error: {ex}', file=sys.stderr)
+        return 1
+    finally:
+        if marks_perf.enabled:
+            _print_perf()
+
+
+def _print_perf():
+    for row in marks_perf.stats():
+        print(
+            f"{row['name']:<20}{row['count']:>8} calls"
+            f"{row['total_ms']:>11.2f} ms{row['max_ms']:>10.2f} ms max",
+            file=sys.stderr,
+        )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
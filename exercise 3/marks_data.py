@@ -0,0 +1,1627 @@
+"""Data layer for the Marks Manager: file formats, RecordStore and helpers.
+
+Nothing here imports tkinter, so it can be used by the GUI
+(StudentManager.py), the command line (marks_cli.py) and batch jobs alike.
+"""
+import os
+import sys
+import csv
+import io
+import math
+import itertools
+import collections
+import time
+import threading
+import mmap
+import struct
+import bisect
+import operator
+from array import array
+
+from marks_perf import timed, timed_iter
+
+# ----------------- Path handling -----------------
+
+
+def get_default_data_file():
+    """
+    Return a safe, portable default path for the data file.
+    - Prefer the folder where this script is located.
+    - Fall back to current working directory if __file__ is not available.
+    """
+    try:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        if not base_dir:
+            raise Exception
+    except Exception:
+        # Fallback: where the program is run from
+        base_dir = os.getcwd()
+
+    return os.path.join(base_dir, 'student_info.txt')
+
+
+# Defaults & constants (must be defined before functions that use them)
+DEFAULT_DATA_FILE = get_default_data_file()
+POSSIBLE_TOTAL = 160  # coursework total (3*20) + exam (100) => 160
+FSYNC = True  # flush saves and journal entries to disk before returning
+JOURNAL_COMPACT_BYTES = 64 * 1024  # fold the journal into the file past this
+SNAPSHOT_EXT = '.msnap'  # data files with this extension use the binary format
+
+
+# ----------------- File utilities -----------------
+
+
+def init_data_file(path=DEFAULT_DATA_FILE):
+    """Ensure directory and file exist. If missing, initialize with 0 count."""
+    dirn = os.path.dirname(path) or '.'
+    os.makedirs(dirn, exist_ok=True)
+    if not os.path.exists(path):
+        if is_snapshot(path):
+            write_records([], path)
+            return
+        with open(path, 'w', newline='') as fh:
+            fh.write('0\n')
+
+
+def iter_records(path=DEFAULT_DATA_FILE, errors=None):
+    """Yield records one at a time as they are parsed from ``path``.
+
+    Each record is a dict with keys:
+    id(int), fullname(str), cw_a(int), cw_b(int), cw_c(int), exam(int)
+    Malformed rows are skipped; if ``errors`` is a list, a
+    (line number, message) pair is appended to it for each one.
+    Only the current row is held in memory.
+    Binary snapshots (SNAPSHOT_EXT) are read through a memory map.
+    """
+    init_data_file(path)
+    if is_snapshot(path):
+        yield from _iter_snapshot(path)
+        return
+    with open(path, 'r', newline='') as fh:
+        reader = csv.reader(fh)
+        first = True
+        for row in reader:
+            if not row:
+                continue
+            # If first row is single integer, treat as count header
+            if first:
+                first = False
+                if len(row) == 1 and row[0].strip().isdigit():
+                    continue
+            row = [c.strip() for c in row]
+            if len(row) < 6:
+                if errors is not None:
+                    errors.append((reader.line_num, 'expected 6 fields'))
+                continue
+            try:
+                rec = {
+                    'id': int(row[0]),
+                    'fullname': row[1],
+                    'cw_a': int(row[2]),
+                    'cw_b': int(row[3]),
+                    'cw_c': int(row[4]),
+                    'exam': int(row[5]),
+                }
+            except ValueError as ex:
+                if errors is not None:
+                    errors.append((reader.line_num, str(ex)))
+                continue
+            yield rec
+
+
+@timed('file.read')
+def read_records(path=DEFAULT_DATA_FILE):
+    """Return list of records (see iter_records for the record layout).
+
+    Any pending journal entries for ``path`` are replayed on top of the
+    file contents.
+    """
+    if not os.path.exists(journal_path(path)):
+        return list(iter_records(path))
+    by_id = {}
+    for rec in iter_records(path):
+        by_id.setdefault(rec['id'], rec)
+    for op, sid, rec in iter_journal(path):
+        if op == 'add':
+            by_id.setdefault(sid, rec)
+        elif op == 'edit' and sid in by_id:
+            if rec['id'] == sid:
+                by_id[sid] = rec
+            elif rec['id'] not in by_id:
+                # Rebuild so an ID change keeps the record's position
+                by_id = {
+                    (rec['id'] if k == sid else k): (rec if k == sid else v)
+                    for k, v in by_id.items()
+                }
+        elif op == 'del':
+            by_id.pop(sid, None)
+    return list(by_id.values())
+
+
+def _record_row(r):
+    return [r['id'], r['fullname'], r['cw_a'], r['cw_b'], r['cw_c'], r['exam']]
+
+
+def _fsync_dir(dirn):
+    # Make the rename itself durable; not supported on every platform.
+    try:
+        fd = os.open(dirn, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@timed('file.save')
+def write_records(records, path=DEFAULT_DATA_FILE, fsync=FSYNC):
+    """Overwrite file with current list of records. Writes count header first.
+
+    The data goes to a temporary file that atomically replaces ``path``, so
+    a crash leaves either the old or the new file. Because the result is a
+    full snapshot, any journal for ``path`` is removed afterwards.
+    Paths ending in SNAPSHOT_EXT are written in the binary format.
+    """
+    dirn = os.path.dirname(path) or '.'
+    os.makedirs(dirn, exist_ok=True)
+    tmp = path + '.tmp'
+    if is_snapshot(path):
+        with open(tmp, 'wb') as fh:
+            _write_snapshot_to(fh, records)
+            if fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+    else:
+        with open(tmp, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow([len(records)])
+            for r in records:
+                writer.writerow(_record_row(r))
+            if fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        _fsync_dir(dirn)
+    try:
+        os.remove(journal_path(path))
+    except FileNotFoundError:
+        pass
+
+
+# ----------------- Journal -----------------
+# Small edits are appended to "<data file>.journal" instead of rewriting
+# the whole data file. Each line is one of:
+#   add,<id>,<name>,<cw_a>,<cw_b>,<cw_c>,<exam>
+#   edit,<old id>,<id>,<name>,<cw_a>,<cw_b>,<cw_c>,<exam>
+#   del,<id>
+# write_records folds the journal back into the data file.
+
+
+def journal_path(path=DEFAULT_DATA_FILE):
+    return path + '.journal'
+
+
+def append_journal(op, sid, rec=None, path=DEFAULT_DATA_FILE, fsync=FSYNC):
+    """Append one mutation to the journal and return the journal size."""
+    return append_journal_many([(op, sid, rec)], path, fsync)
+
+
+@timed('file.journal')
+def append_journal_many(entries, path=DEFAULT_DATA_FILE, fsync=FSYNC):
+    """Append several (op, id, record-or-None) entries in one write.
+
+    Returns the journal size afterwards.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for op, sid, rec in entries:
+        row = [op, sid]
+        if op == 'add':
+            row = [op] + _record_row(rec)
+        elif op == 'edit':
+            row += _record_row(rec)
+        writer.writerow(row)
+    with open(journal_path(path), 'a+b') as fh:
+        # Start on a fresh line if a previous write was torn by a crash
+        if fh.tell():
+            fh.seek(-1, os.SEEK_END)
+            if fh.read(1) != b'\n':
+                fh.write(b'\n')
+        fh.write(buf.getvalue().encode())
+        fh.flush()
+        if fsync:
+            os.fsync(fh.fileno())
+        return fh.tell()
+
+
+def iter_journal(path=DEFAULT_DATA_FILE):
+    """Yield (op, id, record-or-None) for each valid journal entry.
+
+    A torn or malformed line (e.g. from a crash mid-write) is skipped.
+    """
+    try:
+        fh = open(journal_path(path), 'r', newline='')
+    except FileNotFoundError:
+        return
+    with fh:
+        for row in csv.reader(fh):
+            try:
+                op = row[0]
+                if op == 'del' and len(row) == 2:
+                    yield op, int(row[1]), None
+                    continue
+                fields = row[1:] if op == 'add' else row[2:]
+                if op not in ('add', 'edit') or len(fields) != 6:
+                    continue
+                rec = {
+                    'id': int(fields[0]),
+                    'fullname': fields[1].strip(),
+                    'cw_a': int(fields[2]),
+                    'cw_b': int(fields[3]),
+                    'cw_c': int(fields[4]),
+                    'exam': int(fields[5]),
+                }
+                yield op, (rec['id'] if op == 'add' else int(row[1])), rec
+            except (ValueError, IndexError):
+                continue
+
+
+# ----------------- Binary snapshot -----------------
+# Layout (little-endian), chosen so each column can be copied in one go:
+#   header   magic b'MSNP', version (u32), row count n (u32)
+#   columns  id, cw_a, cw_b, cw_c, exam: n x i32 each
+#   offsets  n + 1 x u32 byte offsets into the name blob
+#   names    UTF-8 names joined by newlines
+
+
+SNAPSHOT_MAGIC = b'MSNP'
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct('<4sII')
+
+
+def is_snapshot(path):
+    return path.lower().endswith(SNAPSHOT_EXT)
+
+
+def _to_le(arr):
+    if sys.byteorder != 'little':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr
+
+
+def _write_snapshot_to(fh, records):
+    if isinstance(records, RecordStore):
+        cols = [records.column(f) for f in INT_FIELDS]
+        names = records.names()
+    else:
+        cols = [array('i') for _ in INT_FIELDS]
+        names = []
+        for r in records:
+            for col, f in zip(cols, INT_FIELDS):
+                col.append(r[f])
+            names.append(r['fullname'])
+    encoded = [n.replace('\n', ' ').encode('utf-8') for n in names]
+    offsets = array('I', [0])
+    pos = 0
+    for e in encoded:
+        pos += len(e) + 1
+        offsets.append(pos)
+    fh.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(names)))
+    for col in cols:
+        fh.write(_to_le(col).tobytes())
+    fh.write(_to_le(offsets).tobytes())
+    fh.write(b''.join(e + b'\n' for e in encoded))
+
+
+def _map_snapshot(path):
+    """Return (mmap, n, memoryview columns, offsets, name base offset)."""
+    with open(path, 'rb') as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, n = _SNAPSHOT_HEADER.unpack_from(mm)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        mm.close()
+        raise ValueError(f'{path} is not a marks snapshot')
+    view = memoryview(mm)
+    pos = _SNAPSHOT_HEADER.size
+    cols = {}
+    for f in INT_FIELDS:
+        cols[f] = view[pos:pos + 4 * n].cast('i')
+        pos += 4 * n
+    offsets = view[pos:pos + 4 * (n + 1)].cast('I')
+    return mm, n, cols, offsets, pos + 4 * (n + 1)
+
+
+def _iter_snapshot(path):
+    mm, n, cols, offsets, base = _map_snapshot(path)
+    try:
+        if sys.byteorder != 'little':
+            cols = {f: _to_le(array('i', c.tobytes())) for f, c in cols.items()}
+            offsets = _to_le(array('I', offsets.tobytes()))
+        for i in range(n):
+            name = mm[base + offsets[i]:base + offsets[i + 1] - 1]
+            yield {
+                'id': cols['id'][i],
+                'fullname': name.decode('utf-8'),
+                'cw_a': cols['cw_a'][i],
+                'cw_b': cols['cw_b'][i],
+                'cw_c': cols['cw_c'][i],
+                'exam': cols['exam'][i],
+            }
+    finally:
+        # Views into the map must go before it can be closed
+        for c in cols.values():
+            if isinstance(c, memoryview):
+                c.release()
+        if isinstance(offsets, memoryview):
+            offsets.release()
+        mm.close()
+
+
+@timed('file.parse_snapshot')
+def read_snapshot_columns(path):
+    """Return ({field: array('i')}, [names]) straight from a snapshot.
+
+    Each column is a single bulk copy out of the memory map; names are
+    decoded in one call. No per-field parsing is involved.
+    """
+    init_data_file(path)
+    mm, n, views, offsets, base = _map_snapshot(path)
+    cols = {}
+    try:
+        for f, v in views.items():
+            col = array('i')
+            with v.cast('B') as raw:
+                col.frombytes(raw)
+            cols[f] = _to_le(col)
+        blob = mm[base:]
+    finally:
+        for v in views.values():
+            v.release()
+        offsets.release()
+        mm.close()
+    names = blob.decode('utf-8').split('\n')[:n] if n else []
+    return cols, names
+
+
+def convert_records(src, dst):
+    """Copy the data in ``src`` to ``dst``; formats follow the extensions."""
+    write_records(read_records(src), dst)
+
+
+# ----------------- Cohort ingestion -----------------
+
+MAX_REPORTED_ERRORS = 20  # per-file parse errors kept in an ingest report
+
+
+def cohort_files(directory):
+    """Marks files (text, CSV or snapshot) directly inside ``directory``."""
+    exts = ('.txt', '.csv', SNAPSHOT_EXT)
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(exts)
+        and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def _load_cohort(path):
+    """Worker: parse one file and return plain columns for merging."""
+    start = time.perf_counter()
+    errors = []
+    store = load_store(path, errors)
+    return {
+        'cols': {f: store.column(f) for f in INT_FIELDS},
+        'names': store.names(),
+        'errors': errors[:MAX_REPORTED_ERRORS],
+        'error_count': len(errors) + store.duplicates,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def _cohort_names(paths):
+    """Cohort name for each path: the file name without extension, or the
+    whole file name (then the path) where that would name two files."""
+    names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    for qualify in (os.path.basename, os.path.normpath):
+        counts = collections.Counter(names)
+        names = [qualify(p) if counts[n] > 1 else n for n, p in zip(names, paths)]
+    return names
+
+
+@timed('file.ingest')
+def ingest_cohorts(paths, workers=None):
+    """Load several marks files in parallel and merge them into one store.
+
+    Files are parsed in a process pool; every row is tagged with its
+    cohort (the file name without extension, or the full file name when
+    two files share it, e.g. a.txt and a.csv). Returns (store, report)
+    where report has one dict per file with rows loaded, rows/sec, parse
+    errors and IDs skipped because an earlier cohort already had them.
+    """
+    import concurrent.futures  # only batch ingest needs it; slow to import
+
+    store = RecordStore()
+    report = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_load_cohort, p) for p in paths]
+        for path, cohort, fut in zip(paths, _cohort_names(paths), futures):
+            entry = {'cohort': cohort, 'path': path}
+            try:
+                res = fut.result()
+            except Exception as ex:
+                entry.update(rows=0, failed=str(ex))
+                report.append(entry)
+                continue
+            skipped = store.extend_columns(res['cols'], res['names'], cohort)
+            rows = len(res['names'])
+            entry.update(
+                rows=rows - skipped,
+                duplicates=skipped,
+                errors=res['errors'],
+                error_count=res['error_count'],
+                seconds=res['seconds'],
+                rows_per_sec=rows / res['seconds'] if res['seconds'] else 0.0,
+            )
+            report.append(entry)
+    return store, report
+
+
+def write_cohorts(records, paths, partial=(), fsync=FSYNC):
+    """Write each cohort's rows back to the file it was loaded from.
+
+    ``paths`` maps cohort name -> file, as in an ingest_cohorts report.
+    A cohort whose rows have all been removed is written out empty.
+    Cohorts in ``partial`` had rows skipped at ingest (their IDs belong to
+    an earlier cohort), so ``records`` does not hold their whole file;
+    those files are reloaded on their own and rewritten with just their
+    journal folded in.
+    """
+    rows = {cohort: [] for cohort in paths}
+    for rec in records:
+        rows[rec.get('cohort', '')].append(rec)
+    for cohort, path in paths.items():
+        if cohort in partial:
+            write_records(load_store(path), path, fsync)
+        else:
+            write_records(rows[cohort], path, fsync)
+
+
+# ----------------- Business helpers -----------------
+
+
+def cw_sum(rec):
+    return rec['cw_a'] + rec['cw_b'] + rec['cw_c']
+
+
+def compute_percentage(rec):
+    tot = cw_sum(rec) + rec['exam']
+    if POSSIBLE_TOTAL <= 0:
+        return 0.0
+    return (tot / POSSIBLE_TOTAL) * 100.0
+
+
+# (grade, lowest percentage for it), best grade first
+GRADE_BANDS = (('A', 70), ('B', 60), ('C', 50), ('D', 40), ('F', 0))
+
+
+def grade_from_percentage(pct):
+    for grade, lowest in GRADE_BANDS:
+        if pct >= lowest:
+            return grade
+    return 'F'
+
+
+def validate_record(sid, name, cw_a, cw_b, cw_c, exam):
+    """Check and convert user-entered fields into a record dict.
+
+    Accepts strings or ints; raises ValueError with a readable message.
+    """
+    sid = int(sid)
+    if not (1000 <= sid <= 9999):
+        raise ValueError('ID must be between 1000 and 9999')
+    name = name.strip()
+    if not name:
+        raise ValueError('Name required')
+    cws = [int(cw_a), int(cw_b), int(cw_c)]
+    for cw in cws:
+        if not (0 <= cw <= 20):
+            raise ValueError('Coursework marks must be 0-20')
+    exam = int(exam)
+    if not (0 <= exam <= 100):
+        raise ValueError('Exam must be 0-100')
+    return {
+        'id': sid,
+        'fullname': name,
+        'cw_a': cws[0],
+        'cw_b': cws[1],
+        'cw_c': cws[2],
+        'exam': exam,
+    }
+
+
+# ----------------- Record store -----------------
+
+# Integer columns held by RecordStore, in file order.
+INT_FIELDS = ('id', 'cw_a', 'cw_b', 'cw_c', 'exam')
+GRADES = tuple(grade for grade, _ in GRADE_BANDS)
+
+# Rank keys pack (total marks, student ID) into one signed 64-bit integer
+# so the percentage order fits in an array('q'); bit-shifting keeps the
+# ordering of the pair.
+_ID_BIAS = 1 << 31
+_TOTAL_BIAS = 1 << 30
+_MIN_ID = -_ID_BIAS
+
+
+def _rank_key(total, sid):
+    return ((total + _TOTAL_BIAS) << 32) | (sid + _ID_BIAS)
+
+
+def _rank_id(key):
+    return (key & 0xFFFFFFFF) - _ID_BIAS
+
+
+class NameIndex:
+    """Case-folded trigram index over student names.
+
+    Postings are kept per distinct name rather than per student, so a
+    cohort full of repeated names stays small:
+    trigram -> set of folded names, folded name -> set of student IDs.
+    A substring query intersects the postings of its trigrams and only
+    checks the surviving names. A sorted list of (word, name) pairs serves
+    ranked prefix lookups for type-ahead search.
+    """
+
+    def __init__(self, pairs=()):
+        self._grams = {}
+        self._ids = {}
+        self._words = []
+        # Bulk load: collect words unsorted and sort once at the end.
+        for sid, name in pairs:
+            self._add(sid, name, self._words.append)
+        self._words.sort()
+
+    @staticmethod
+    def _trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, sid, name):
+        self._add(sid, name, lambda pair: bisect.insort(self._words, pair))
+
+    def _add(self, sid, name, add_word):
+        key = name.casefold()
+        ids = self._ids.get(key)
+        if ids is None:
+            ids = self._ids[key] = set()
+            for gram in self._trigrams(key):
+                self._grams.setdefault(gram, set()).add(key)
+            for word in set(key.split()):
+                add_word((word, key))
+        ids.add(sid)
+
+    def remove(self, sid, name):
+        key = name.casefold()
+        ids = self._ids.get(key)
+        if ids is None:
+            return
+        ids.discard(sid)
+        if ids:
+            return
+        del self._ids[key]
+        for gram in self._trigrams(key):
+            names = self._grams[gram]
+            names.discard(key)
+            if not names:
+                del self._grams[gram]
+        for word in set(key.split()):
+            i = bisect.bisect_left(self._words, (word, key))
+            del self._words[i]
+
+    def search(self, fragment):
+        """Return the set of IDs whose name contains ``fragment``."""
+        frag = fragment.casefold()
+        if len(frag) < 3:
+            names = [k for k in self._ids if frag in k]
+        else:
+            postings = []
+            for gram in self._trigrams(frag):
+                names = self._grams.get(gram)
+                if not names:
+                    return set()
+                postings.append(names)
+            postings.sort(key=len)
+            candidates = set.intersection(*postings)
+            names = [k for k in candidates if frag in k]
+        found = set()
+        for k in names:
+            found |= self._ids[k]
+        return found
+
+    def prefix(self, text, limit=10):
+        """Return up to ``limit`` IDs whose name has a word starting with
+        ``text``; names that start with it rank first, then alphabetical.
+        """
+        text = text.casefold().strip()
+        if not text:
+            return []
+        lead = text.split()[0]
+        ranked = set()
+        i = bisect.bisect_left(self._words, (lead,))
+        while i < len(self._words) and self._words[i][0].startswith(lead):
+            key = self._words[i][1]
+            if text in key:
+                ranked.add((not key.startswith(text), key))
+            i += 1
+        found = []
+        for _, key in sorted(ranked):
+            found.extend(sorted(self._ids[key]))
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+
+class IdIndex:
+    """Student ID -> slot map kept in two flat arrays (open addressing).
+
+    A dict of int objects costs about 70 bytes an entry. Here an entry is
+    two 4-byte cells and the table is kept a quarter to two thirds full,
+    so it costs 12-32 bytes. Lookups, adds and removes probe neighbouring
+    cells (linear probing) and take constant time on average; a removal
+    leaves a tombstone that the next resize drops.
+    """
+
+    _EMPTY = -1
+    _GONE = -2
+
+    def __init__(self, size=0):
+        cap = 8
+        while cap < 2 * size:
+            cap *= 2
+        self._alloc(cap)
+
+    def _alloc(self, cap):
+        self._keys = array('i', bytes(4 * cap))
+        self._slots = array('i', [self._EMPTY]) * cap
+        self._mask = cap - 1
+        self._shift = 33 - cap.bit_length()
+        self._len = 0
+        self._used = 0  # live entries plus tombstones
+
+    def _home(self, sid):
+        # Fibonacci hashing: the top bits of a 32-bit multiplicative hash
+        return ((sid * 0x9E3779B1) & 0xFFFFFFFF) >> self._shift
+
+    def _find(self, sid):
+        """Cell holding ``sid``, or -1."""
+        keys, slots, mask = self._keys, self._slots, self._mask
+        i = self._home(sid)
+        while True:
+            slot = slots[i]
+            if slot == self._EMPTY:
+                return -1
+            if slot != self._GONE and keys[i] == sid:
+                return i
+            i = (i + 1) & mask
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, sid):
+        return self._find(sid) >= 0
+
+    def get(self, sid):
+        """Slot of ``sid``, or None."""
+        i = self._find(sid)
+        return None if i < 0 else self._slots[i]
+
+    def add(self, sid, slot):
+        """Map ``sid`` to ``slot``; returns False, changing nothing, if
+        ``sid`` is already there."""
+        keys, slots, mask = self._keys, self._slots, self._mask
+        i = self._home(sid)
+        free = -1
+        while True:
+            cell = slots[i]
+            if cell == self._EMPTY:
+                break
+            if cell == self._GONE:
+                if free < 0:
+                    free = i
+            elif keys[i] == sid:
+                return False
+            i = (i + 1) & mask
+        if free >= 0:
+            i = free
+        else:
+            self._used += 1
+        keys[i] = sid
+        slots[i] = slot
+        self._len += 1
+        if 3 * self._used > 2 * len(slots):
+            self._resize()
+        return True
+
+    def pop(self, sid):
+        """Remove ``sid`` and return its slot; KeyError if it is absent."""
+        i = self._find(sid)
+        if i < 0:
+            raise KeyError(sid)
+        slot = self._slots[i]
+        self._slots[i] = self._GONE
+        self._len -= 1
+        return slot
+
+    def items(self):
+        """(ID, slot) pairs, in no particular order."""
+        slots = self._slots
+        used = map(operator.le, itertools.repeat(0), slots)
+        cells = itertools.compress(range(len(slots)), used)
+        return ((self._keys[i], slots[i]) for i in cells)
+
+    def _resize(self):
+        pairs = list(self.items())
+        cap = 8
+        while cap < 2 * len(pairs):
+            cap *= 2
+        self._alloc(cap)
+        for sid, slot in pairs:
+            self.add(sid, slot)
+
+    def copy(self):
+        clone = IdIndex()
+        clone._keys = array('i', self._keys)
+        clone._slots = array('i', self._slots)
+        clone._mask, clone._shift = self._mask, self._shift
+        clone._len, clone._used = self._len, self._used
+        return clone
+
+
+class RankIndex:
+    """Sorted multiset of integers kept in blocks (a blocked sorted list).
+
+    Each block is a sorted ``array('q')`` of at most 2 * LOAD keys; the
+    last key of every block is kept in ``_maxes`` to pick the block, and a
+    Fenwick tree over the block lengths turns a block number into a
+    position and back. Adding or removing a key shifts one block and
+    touches O(log n) tree cells; a block that outgrows 2 * LOAD is split
+    and an emptied one dropped, which rebuilds the small tree.
+    """
+
+    LOAD = 1024
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        load = self.LOAD
+        self._blocks = [array('q', keys[i:i + load]) for i in range(0, len(keys), load)]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [block[-1] for block in self._blocks]
+        tree = [0]
+        tree.extend(map(len, self._blocks))
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+        self._len = sum(map(len, self._blocks))
+
+    def _bump(self, b, delta):
+        tree = self._tree
+        i = b + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _before(self, b):
+        """Number of keys in the blocks ahead of block ``b``."""
+        tree = self._tree
+        total = 0
+        while b:
+            total += tree[b]
+            b &= b - 1
+        return total
+
+    def _locate(self, pos):
+        """(block, offset) of position ``pos``; pos must be < len."""
+        tree = self._tree
+        b = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = b + step
+            if nxt < len(tree) and tree[nxt] <= pos:
+                b = nxt
+                pos -= tree[nxt]
+            step >>= 1
+        return b, pos
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._blocks)
+
+    def add(self, key):
+        blocks = self._blocks
+        if not blocks:
+            blocks.append(array('q', [key]))
+            self._rebuild()
+            return
+        b = min(bisect.bisect_left(self._maxes, key), len(blocks) - 1)
+        block = blocks[b]
+        bisect.insort(block, key)
+        self._maxes[b] = block[-1]
+        self._len += 1
+        if len(block) > 2 * self.LOAD:
+            blocks[b:b + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._rebuild()
+        else:
+            self._bump(b, 1)
+
+    def remove(self, key):
+        """Remove one ``key``; raises ValueError if it is not there."""
+        b = bisect.bisect_left(self._maxes, key)
+        if b == len(self._blocks):
+            raise ValueError(key)
+        block = self._blocks[b]
+        i = bisect.bisect_left(block, key)
+        if block[i] != key:
+            raise ValueError(key)
+        del block[i]
+        self._len -= 1
+        if block:
+            self._maxes[b] = block[-1]
+            self._bump(b, -1)
+        else:
+            del self._blocks[b]
+            self._rebuild()
+
+    def bisect_left(self, key):
+        """Number of keys less than ``key``."""
+        b = bisect.bisect_left(self._maxes, key)
+        if b == len(self._blocks):
+            return self._len
+        return self._before(b) + bisect.bisect_left(self._blocks[b], key)
+
+    def between(self, start, stop):
+        """Keys at positions ``start`` to ``stop`` (exclusive), in order."""
+        start = max(0, start)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        b, i = self._locate(start)
+        keys = []
+        want = stop - start
+        while len(keys) < want:
+            keys.extend(self._blocks[b][i:i + want - len(keys)])
+            b, i = b + 1, 0
+        return keys
+
+    def copy(self):
+        clone = RankIndex.__new__(RankIndex)
+        clone._blocks = [array('q', block) for block in self._blocks]
+        clone._maxes = list(self._maxes)
+        clone._tree = list(self._tree)
+        clone._len = self._len
+        return clone
+
+
+class RecordStore:
+    """Columnar container for student records.
+
+    Each integer field lives in its own ``array('i')`` column and names are
+    kept in a list of interned strings. With the derived columns and the
+    indexes a row costs about 75 bytes plus its name, against some 280 for
+    a six-key dict. Records are handed out as plain dicts built on demand,
+    which keeps ``rec['fullname']`` style access working for the display
+    code and RecordEditor.
+
+    Student IDs are unique keys. An IdIndex (an id -> slot hash table in
+    two arrays) gives constant-time lookup, duplicate checks, edits and
+    deletes for about a third of what a dict would cost. Deleted rows are
+    only flagged dead and are squeezed out in bulk once they make up half
+    the store (or before a sort or whole-store calculation), so removing a
+    record never shifts the columns.
+
+    Name searches go through a NameIndex that is built on first use and
+    then kept up to date by every mutation.
+
+    Rows can be tagged with the cohort (module) they were loaded from; the
+    tag is an index into ``cohorts`` and shows up as ``rec['cohort']``.
+
+    Coursework total, percentage and grade are computed once per row when
+    it is stored or edited and handed out as ``cw_total``, ``pct`` and
+    ``grade``. Count, percentage sum and the grade histogram are kept up
+    to date on every change, so summary() is O(1).
+
+    A RankIndex of rank keys (total marks, then ID, packed into one
+    integer; see _rank_key) orders the rows by percentage with O(log n)
+    updates and position lookups. It gives top/bottom-N, percentile rank
+    and percentage-range queries, and the order for sorting by percentage.
+    """
+
+    def __init__(self, records=()):
+        self._cols = {f: array('i') for f in INT_FIELDS}
+        self._names = []
+        self._cohort = array('H')
+        self.cohorts = ['']
+        # Derived per-row values (see _derive) and running aggregates
+        self._cw = array('i')
+        self._pct = array('d')
+        self._grade = bytearray()
+        self._pct_sum = 0.0
+        self._grade_counts = dict.fromkeys(GRADES, 0)
+        self._order = RankIndex()
+        self._live = bytearray()
+        self._index = IdIndex()
+        self._dead = 0
+        # Slots of the live rows in store order, built by row_at while
+        # there are dead rows and dropped on compaction
+        self._view = None
+        self._name_index = None
+        # Rows dropped while loading because their ID was already present
+        self.duplicates = 0
+        self._load(records)
+
+    def _load(self, records):
+        """Fill an empty store from ``records``, sorting the rank index
+        once at the end rather than inserting into it row by row."""
+        cols = [self._cols[f].append for f in INT_FIELDS]
+        names = self._names
+        cohort = self._cohort
+        for rec in records:
+            # Convert every value first so a bad record leaves no partial row.
+            values = [int(rec[f]) for f in INT_FIELDS]
+            name = sys.intern(rec['fullname'])
+            tag = self._cohort_index(rec.get('cohort', ''))
+            for add, v in zip(cols, values):
+                add(v)
+            names.append(name)
+            cohort.append(tag)
+        self._live = bytearray(b'\x01') * len(names)
+        self._derive_bulk(0)
+        self._index = IdIndex(len(names))
+        self.duplicates += self._index_rows()
+
+    # ---------- ID index ----------
+    def _index_rows(self, start=0):
+        """Add the live rows from ``start`` on to the ID index. A row whose
+        ID is already there is dropped; returns how many were."""
+        ids = self._cols['id']
+        live = self._live
+        add = self._index.add
+        dropped = [
+            slot
+            for slot in range(start, len(ids))
+            if live[slot] and not add(ids[slot], slot)
+        ]
+        for slot in dropped:
+            self._count(slot, -1)
+            live[slot] = 0
+        self._dead += len(dropped)
+        if dropped:
+            self._compact()
+        return len(dropped)
+
+    def _reindex(self):
+        self._index = IdIndex(len(self._live) - self._dead)
+        self._index_rows()
+
+    def _slot(self, sid):
+        """Slot of student ``sid``, or None."""
+        return self._index.get(sid)
+
+    def _pct_order(self):
+        """Slots of the live rows by percentage, ties by ID."""
+        return list(self._slots_of(map(_rank_id, self._order)))
+
+    def _slots_of(self, ids):
+        """Slots of ``ids``, which must all be present."""
+        return map(self._index.get, ids)
+
+    # ---------- container protocol ----------
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, sid):
+        return sid in self._index
+
+    def __iter__(self):
+        live = self._live
+        for slot in range(len(live)):
+            if live[slot]:
+                yield self._row(slot)
+
+    def _row(self, slot):
+        cols = self._cols
+        rec = {
+            'id': cols['id'][slot],
+            'fullname': self._names[slot],
+            'cw_a': cols['cw_a'][slot],
+            'cw_b': cols['cw_b'][slot],
+            'cw_c': cols['cw_c'][slot],
+            'exam': cols['exam'][slot],
+        }
+        rec['cw_total'] = self._cw[slot]
+        rec['pct'] = self._pct[slot]
+        rec['grade'] = chr(self._grade[slot])
+        if self._cohort[slot]:
+            rec['cohort'] = self.cohorts[self._cohort[slot]]
+        return rec
+
+    @staticmethod
+    def _derive(values):
+        """(coursework total, percentage, grade byte) for INT_FIELDS values."""
+        _, a, b, c, exam = values
+        cw = a + b + c
+        pct = 0.0 if POSSIBLE_TOTAL <= 0 else ((cw + exam) / POSSIBLE_TOTAL) * 100.0
+        return cw, pct, ord(grade_from_percentage(pct))
+
+    def _count(self, slot, sign):
+        """Add (sign=1) or take away (sign=-1) one row from the aggregates
+        and the percentage order."""
+        self._pct_sum += sign * self._pct[slot]
+        self._grade_counts[chr(self._grade[slot])] += sign
+        total = self._cw[slot] + self._cols['exam'][slot]
+        key = _rank_key(total, self._cols['id'][slot])
+        if sign > 0:
+            self._order.add(key)
+        else:
+            self._order.remove(key)
+
+    def _cohort_index(self, name):
+        try:
+            return self.cohorts.index(name)
+        except ValueError:
+            self.cohorts.append(name)
+            return len(self.cohorts) - 1
+
+    # ---------- keyed access ----------
+    def append(self, rec):
+        """Add a record; raises ValueError if its ID is already present."""
+        # Convert every value first so a bad record leaves no partial row.
+        values = [int(rec[f]) for f in INT_FIELDS]
+        if values[0] in self:
+            raise ValueError(f'ID {values[0]} already exists')
+        name = sys.intern(rec['fullname'])
+        cohort = self._cohort_index(rec.get('cohort', ''))
+        cw, pct, grade = self._derive(values)
+        for f, v in zip(INT_FIELDS, values):
+            self._cols[f].append(v)
+        self._names.append(name)
+        self._cohort.append(cohort)
+        self._cw.append(cw)
+        self._pct.append(pct)
+        self._grade.append(grade)
+        self._live.append(1)
+        if self._view is not None:
+            self._view.append(len(self._names) - 1)
+        self._index.add(values[0], len(self._names) - 1)
+        self._count(len(self._names) - 1, 1)
+        if self._name_index is not None:
+            self._name_index.add(values[0], name)
+
+    def get_id(self, sid):
+        slot = self._slot(sid)
+        if slot is None:
+            return None
+        return self._row(slot)
+
+    def replace_id(self, sid, rec):
+        """Overwrite record ``sid`` in place; ``rec`` may carry a new ID.
+
+        The row keeps its cohort unless ``rec`` names a different one.
+        """
+        values = [int(rec[f]) for f in INT_FIELDS]
+        new_id = values[0]
+        if new_id != sid and new_id in self:
+            raise ValueError(f'ID {new_id} already exists')
+        slot = self._index.pop(sid)
+        name = sys.intern(rec['fullname'])
+        if self._name_index is not None:
+            self._name_index.remove(sid, self._names[slot])
+            self._name_index.add(new_id, name)
+        self._names[slot] = name
+        self._count(slot, -1)
+        for f, v in zip(INT_FIELDS, values):
+            self._cols[f][slot] = v
+        self._cw[slot], self._pct[slot], self._grade[slot] = self._derive(values)
+        self._count(slot, 1)
+        if 'cohort' in rec:
+            self._cohort[slot] = self._cohort_index(rec['cohort'])
+        self._index.add(new_id, slot)
+
+    def remove_id(self, sid):
+        slot = self._index.pop(sid)
+        if self._name_index is not None:
+            self._name_index.remove(sid, self._names[slot])
+        self._count(slot, -1)
+        self._live[slot] = 0
+        self._names[slot] = ''
+        self._dead += 1
+        if self._view is not None:
+            del self._view[bisect.bisect_left(self._view, slot)]
+        if self._dead > len(self._index):
+            self._compact()
+
+    def clear(self):
+        self.__init__()
+
+    @classmethod
+    def from_columns(cls, cols, names):
+        """Build a store that adopts ready-made columns (see INT_FIELDS).
+
+        Rows whose ID an earlier row already has are dropped and counted
+        in ``duplicates``.
+        """
+        store = cls()
+        store._cols = {f: cols[f] for f in INT_FIELDS}
+        store._names = [sys.intern(n) for n in names]
+        store._cohort = array('H', bytes(2 * len(names)))
+        store._live = bytearray(b'\x01') * len(names)
+        store._derive_bulk(0)
+        store._index = IdIndex(len(names))
+        store.duplicates = store._index_rows()
+        return store
+
+    def _derive_bulk(self, start):
+        """Compute derived columns and aggregates for rows from ``start``."""
+        c = self._cols
+        cw = array(
+            'i',
+            map(
+                operator.add,
+                map(operator.add, c['cw_a'][start:], c['cw_b'][start:]),
+                c['cw_c'][start:],
+            ),
+        )
+        if POSSIBLE_TOTAL <= 0:
+            pct = array('d', bytes(8 * len(cw)))
+        else:
+            total = POSSIBLE_TOTAL
+            pct = array(
+                'd',
+                [((t + e) / total) * 100.0 for t, e in zip(cw, c['exam'][start:])],
+            )
+        grades = ''.join(map(grade_from_percentage, pct))
+        self._cw.extend(cw)
+        self._pct.extend(pct)
+        self._grade.extend(grades.encode('ascii'))
+        self._pct_sum += math.fsum(pct)
+        for g in GRADES:
+            self._grade_counts[g] += grades.count(g)
+        totals = map(operator.add, cw, c['exam'][start:])
+        keys = list(map(_rank_key, totals, c['id'][start:]))
+        keys.extend(self._order)
+        self._order = RankIndex(keys)
+
+    def extend_columns(self, cols, names, cohort=''):
+        """Bulk-append ready-made columns, all tagged with ``cohort``.
+
+        Rows whose ID is already in the store are skipped; the number
+        skipped is returned.
+        """
+        ids = cols['id']
+        tag = self._cohort_index(cohort)
+        keep = None
+        if len(set(ids)) != len(ids) or any(map(self.__contains__, ids)):
+            seen = {sid for sid, _ in self._index.items()}
+            keep = []
+            for i, sid in enumerate(ids):
+                if sid not in seen:
+                    seen.add(sid)
+                    keep.append(i)
+            cols = {f: array('i', [cols[f][i] for i in keep]) for f in INT_FIELDS}
+            names = [names[i] for i in keep]
+        start = len(self._names)
+        for f in INT_FIELDS:
+            self._cols[f].extend(cols[f])
+        self._names.extend(sys.intern(n) for n in names)
+        self._cohort.extend(array('H', [tag]) * len(names))
+        self._live.extend(b'\x01' * len(names))
+        self._derive_bulk(start)
+        self._view = None
+        self._index_rows(start)
+        if self._name_index is not None:
+            for sid, name in zip(cols['id'], names):
+                self._name_index.add(sid, name)
+        return 0 if keep is None else len(ids) - len(keep)
+
+    def copy(self):
+        """Independent copy (e.g. to save from another thread). Column
+        copies are bulk memory copies; the name index is not copied."""
+        self._compact()
+        clone = RecordStore()
+        clone._cols = {f: array('i', col) for f, col in self._cols.items()}
+        clone._names = list(self._names)
+        clone._cohort = array('H', self._cohort)
+        clone.cohorts = list(self.cohorts)
+        clone._cw = array('i', self._cw)
+        clone._pct = array('d', self._pct)
+        clone._grade = bytearray(self._grade)
+        clone._pct_sum = self._pct_sum
+        clone._grade_counts = dict(self._grade_counts)
+        clone._order = self._order.copy()
+        clone._live = bytearray(self._live)
+        clone._index = self._index.copy()
+        clone.duplicates = self.duplicates
+        return clone
+
+    def names(self):
+        """Names of the live rows, in store order."""
+        self._compact()
+        return self._names
+
+    # ---------- name search ----------
+    def _names_indexed(self):
+        if self._name_index is None:
+            names = self._names
+            self._name_index = NameIndex(
+                (sid, names[slot]) for sid, slot in self._index.items()
+            )
+        return self._name_index
+
+    def find_name(self, fragment):
+        """Records whose name contains ``fragment`` (case-insensitive),
+        in store order."""
+        ids = self._names_indexed().search(fragment)
+        if len(ids) * 16 < len(self._index):
+            return [self._row(slot) for slot in sorted(self._slots_of(ids))]
+        # Many hits: one pass over the ID column beats a bisect for each
+        hits = map(ids.__contains__, self._cols['id'])
+        live_hits = map(operator.and_, self._live, hits)
+        slots = itertools.compress(range(len(self._live)), live_hits)
+        return list(map(self._row, slots))
+
+    def prefix_matches(self, text, limit=10):
+        """Ranked type-ahead matches for ``text`` (see NameIndex.prefix)."""
+        ids = self._names_indexed().prefix(text, limit)
+        return list(map(self._row, self._slots_of(ids)))
+
+    def column(self, field):
+        """Return the array for an integer field, one entry per live row."""
+        self._compact()
+        return self._cols[field]
+
+    # ---------- whole-store calculations ----------
+    def cw_totals(self):
+        """Coursework total for every row, as an array('i')."""
+        self._compact()
+        return array('i', self._cw)
+
+    def summary(self):
+        """Cohort aggregates: count, sum, average, best, worst, grades.
+
+        ``best``/``worst`` are record dicts (None when empty) and
+        ``grades`` maps each grade letter to its head count.
+        """
+        count = len(self._index)
+        best = worst = None
+        if count:
+            best, worst = self.top(1)[0], self.bottom(1)[0]
+        return {
+            'count': count,
+            'sum': self._pct_sum,
+            'average': self._pct_sum / count if count else 0.0,
+            'best': best,
+            'worst': worst,
+            'grades': dict(self._grade_counts),
+        }
+
+    # ---------- ordering ----------
+    def _permute(self, order):
+        """Rebuild every column (and the index) in the given slot order."""
+        self._names = [self._names[i] for i in order]
+        self._cohort = array('H', [self._cohort[i] for i in order])
+        self._cw = array('i', [self._cw[i] for i in order])
+        self._pct = array('d', [self._pct[i] for i in order])
+        self._grade = bytearray([self._grade[i] for i in order])
+        for f, col in self._cols.items():
+            self._cols[f] = array('i', [col[i] for i in order])
+        self._live = bytearray(b'\x01') * len(order)
+        self._dead = 0
+        self._view = None
+        self._reindex()
+
+    def _compact(self):
+        if self._dead:
+            live = self._live
+            self._permute([i for i in range(len(live)) if live[i]])
+
+    def sort(self, key=None, reverse=False):
+        """Sort rows in place; ``key`` receives each record dict (default ID)."""
+        self._compact()
+        if key is None:
+            keys = self._cols['id']
+        else:
+            keys = [key(r) for r in self]
+        order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        self._permute(order)
+
+    def sort_by_percentage(self, reverse=False):
+        """Reorder rows by percentage (ties by ID) straight from the index."""
+        order = self._pct_order()
+        if reverse:
+            order.reverse()
+        self._permute(order)
+
+    def row_at(self, i):
+        """Record at position ``i`` in store order.
+
+        Dead rows are skipped through a list of live slots rather than
+        compacted away, so a table reading rows between removals never
+        rebuilds the columns.
+        """
+        if not self._dead:
+            return self._row(i)
+        if self._view is None:
+            live = self._live
+            self._view = array('i', itertools.compress(range(len(live)), live))
+        return self._row(self._view[i])
+
+    def order_by(self, field, reverse=False):
+        """Positions (for row_at) ordered by a record field.
+
+        Percentage order comes straight from the rank index; other fields
+        are sorted on their column.
+        """
+        self._compact()
+        if field in ('pct', 'grade', 'cw_total'):
+            if field == 'pct':
+                order = self._pct_order()
+                if reverse:
+                    order.reverse()
+                return order
+            keys = self._cw if field == 'cw_total' else self._grade
+        elif field == 'fullname':
+            keys = self._names
+        elif field == 'cohort':
+            keys = [self.cohorts[c] for c in self._cohort]
+        else:
+            keys = self._cols[field]
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+
+    # ---------- rank queries ----------
+    def _rows_for(self, keys):
+        return list(map(self._row, self._slots_of(map(_rank_id, keys))))
+
+    def top(self, n=1):
+        """The ``n`` best records, highest percentage first."""
+        size = len(self._order)
+        return self._rows_for(reversed(self._order.between(size - max(0, n), size)))
+
+    def bottom(self, n=1):
+        """The ``n`` weakest records, lowest percentage first."""
+        return self._rows_for(self._order.between(0, n))
+
+    def percentile_rank(self, sid):
+        """Percent of the cohort scoring below student ``sid`` (ties count
+        half), or None if the ID is unknown."""
+        slot = self._slot(sid)
+        if slot is None:
+            return None
+        total = self._cw[slot] + self._cols['exam'][slot]
+        below = self._order.bisect_left(_rank_key(total, _MIN_ID))
+        upto = self._order.bisect_left(_rank_key(total + 1, _MIN_ID))
+        return (below + (upto - below) / 2) / len(self._order) * 100.0
+
+    def pct_range(self, low, high):
+        """Records with ``low`` <= percentage <= ``high``, lowest first."""
+        if POSSIBLE_TOTAL <= 0:
+            return list(self) if low <= 0.0 <= high else []
+        # Percentages only come from whole-mark totals, so convert the bounds
+        lo_total = math.ceil(low * POSSIBLE_TOTAL / 100.0 - 1e-9)
+        hi_total = math.floor(high * POSSIBLE_TOTAL / 100.0 + 1e-9)
+        if lo_total > hi_total:
+            return []
+        i = self._order.bisect_left(_rank_key(lo_total, _MIN_ID))
+        j = self._order.bisect_left(_rank_key(hi_total + 1, _MIN_ID))
+        return self._rows_for(self._order.between(i, j))
+
+
+class LoadCancelled(Exception):
+    """Raised inside load_store when its LoadProgress is cancelled."""
+
+
+class LoadProgress:
+    """Shared between a loading thread and the UI: rows parsed so far and a
+    cancellation flag."""
+
+    def __init__(self):
+        self.rows = 0
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def track(self, records):
+        """Pass ``records`` through, counting them and honouring cancel."""
+        for rec in records:
+            if self.rows % 1024 == 0 and self._cancel.is_set():
+                raise LoadCancelled()
+            self.rows += 1
+            yield rec
+
+
+@timed('file.load')
+def load_store(path=DEFAULT_DATA_FILE, errors=None, progress=None):
+    """Load ``path`` into a RecordStore, replaying any pending journal.
+
+    ``errors`` collects skipped rows as for iter_records. A LoadProgress
+    passed as ``progress`` is updated as rows are read and can cancel the
+    load (LoadCancelled is raised).
+    """
+    if is_snapshot(path):
+        store = RecordStore.from_columns(*read_snapshot_columns(path))
+        if progress is not None:
+            progress.rows = len(store)
+    else:
+        records = timed_iter('file.parse', iter_records(path, errors))
+        if progress is not None:
+            records = progress.track(records)
+        store = RecordStore(records)
+    for op, sid, rec in iter_journal(path):
+        try:
+            if op == 'add':
+                store.append(rec)
+            elif op == 'edit':
+                store.replace_id(sid, rec)
+            elif op == 'del':
+                store.remove_id(sid)
+        except (KeyError, ValueError):
+            # Already applied (e.g. crash before the journal was removed)
+            continue
+    return store
+
+
+# ----------------- Statistics -----------------
+# Marks are small bounded integers, so every distribution is summarised
+# from a value -> count histogram. With NumPy installed the histograms and
+# correlations are computed over the columns in one batch each (zero-copy
+# views of the arrays); without it collections.Counter does the counting.
+# NumPy is imported the first time statistics are asked for: it takes
+# longer to import than everything else the GUI and CLI need together.
+
+STAT_FIELDS = ('cw_a', 'cw_b', 'cw_c', 'exam')
+
+_numpy = None  # the module, False when it is not installed, None untried
+
+
+def load_numpy():
+    """NumPy if it is installed, else None (imported on first call)."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:  # optional, only speeds up cohort_stats
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+def _as_numpy(col):
+    return load_numpy().frombuffer(col, dtype=f'i{col.itemsize}')
+
+
+def _histogram(col):
+    """value -> count for an integer column."""
+    np = load_numpy()
+    if np is None:
+        return collections.Counter(col)
+    a = _as_numpy(col)
+    if not len(a):
+        return {}
+    lowest = int(a.min())
+    counts = np.bincount(a - lowest)
+    present = np.flatnonzero(counts)
+    return dict(zip((present + lowest).tolist(), counts[present].tolist()))
+
+
+def _hist_quantile(values, cum, n, p):
+    """Quantile ``p`` (0-1) from sorted distinct ``values`` and cumulative
+    counts, interpolating like statistics.quantiles(method='inclusive')."""
+    pos = p * (n - 1)
+    lo = int(pos)
+    frac = pos - lo
+    low_value = values[bisect.bisect_right(cum, lo)]
+    if frac == 0 or lo + 1 >= n:
+        return float(low_value)
+    high_value = values[bisect.bisect_right(cum, lo + 1)]
+    return low_value + (high_value - low_value) * frac
+
+
+def distribution(hist, scale=1.0):
+    """Summary of a value -> count histogram; values are multiplied by
+    ``scale`` (e.g. to turn total marks into percentages)."""
+    n = sum(hist.values())
+    if not n:
+        return {'count': 0}
+    values = sorted(hist)
+    cum = list(itertools.accumulate(hist[v] for v in values))
+    mean = math.fsum(v * c for v, c in hist.items()) / n
+    var = math.fsum(c * (v - mean) ** 2 for v, c in hist.items()) / n
+    q1, median, q3 = (_hist_quantile(values, cum, n, p) for p in (0.25, 0.5, 0.75))
+    return {
+        'count': n,
+        'mean': mean * scale,
+        'stdev': math.sqrt(var) * scale,
+        'min': values[0] * scale,
+        'q1': q1 * scale,
+        'median': median * scale,
+        'q3': q3 * scale,
+        'max': values[-1] * scale,
+    }
+
+
+def _correlations(cols, hists, pairs):
+    """Pearson r for each (a, b) pair of column names."""
+    n = len(cols[pairs[0][0]])
+    np = load_numpy()
+    if np is not None:
+        names = sorted({f for pair in pairs for f in pair})
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = np.corrcoef(np.stack([_as_numpy(cols[f]) for f in names]))
+        at = {f: i for i, f in enumerate(names)}
+        return {
+            (a, b): float(np.nan_to_num(r[at[a], at[b]])) if n > 1 else 0.0
+            for a, b in pairs
+        }
+    # Column sums and sums of squares come cheaply from the histograms
+    sums = {f: sum(v * c for v, c in h.items()) for f, h in hists.items()}
+    squares = {f: sum(v * v * c for v, c in h.items()) for f, h in hists.items()}
+    result = {}
+    for a, b in pairs:
+        cov = n * sum(map(operator.mul, cols[a], cols[b])) - sums[a] * sums[b]
+        den = math.sqrt(
+            (n * squares[a] - sums[a] ** 2) * (n * squares[b] - sums[b] ** 2)
+        )
+        result[a, b] = cov / den if den else 0.0
+    return result
+
+
+@timed('stats.cohort')
+def cohort_stats(store):
+    """Descriptive statistics for a RecordStore.
+
+    Returns a dict with ``overall`` (percentage distribution), ``grades``
+    (head count per grade with its GRADE_BANDS lower bound), per component
+    (cw_a, cw_b, cw_c, exam, cw_total) distributions with value histograms,
+    and the Pearson correlations between components keyed ``'a~b'``.
+    """
+    cols = {f: store.column(f) for f in STAT_FIELDS}
+    cols['cw_total'] = store.cw_totals()
+    np = load_numpy()
+    if np is not None:
+        totals = _as_numpy(cols['cw_total']) + _as_numpy(cols['exam'])
+        totals = array('i', totals.astype(np.int32).tobytes())
+    else:
+        totals = array('i', map(operator.add, cols['cw_total'], cols['exam']))
+    hists = {f: _histogram(col) for f, col in cols.items()}
+    components = {}
+    for f, hist in hists.items():
+        components[f] = distribution(hist)
+        components[f]['histogram'] = dict(sorted(hist.items()))
+    pairs = list(itertools.combinations(STAT_FIELDS, 2)) + [('cw_total', 'exam')]
+    correlations = {}
+    if len(store) > 1:
+        correlations = {
+            f'{a}~{b}': r for (a, b), r in _correlations(cols, hists, pairs).items()
+        }
+    scale = 100.0 / POSSIBLE_TOTAL if POSSIBLE_TOTAL > 0 else 0.0
+    grades = store.summary()['grades']
+    return {
+        'count': len(store),
+        'overall': distribution(_histogram(totals), scale),
+        'grades': {g: {'count': grades[g], 'from_pct': lo} for g, lo in GRADE_BANDS},
+        'components': components,
+        'correlations': correlations,
+    }
@@ -0,0 +1,201 @@
+"""Opt-in timing counters and profiling hooks for the Marks Manager.
+
+Instrumentation is off unless MARKS_PROFILE is set to something other
+than '' or '0', or it is switched on at run time (Help > Instrumentation
+in the GUI). While off, every probe costs one flag check.
+
+Probes are named '<area>.<what>', e.g. 'file.load' or 'dialog.Find':
+
+    @timed('file.save')
+    def write_records(...): ...
+
+    with span('dialog.Find'):
+        simpledialog.askstring(...)
+
+Counters are kept per name (count, total, max) and are safe to update
+from the background I/O thread.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = 'MARKS_PROFILE'
+
+enabled = os.environ.get(ENV_VAR, '') not in ('', '0')
+
+_lock = threading.Lock()
+_stats = {}
+_profiler = None
+
+
+def enable(on=True):
+    global enabled
+    enabled = bool(on)
+
+
+def record(name, seconds):
+    """Add one timed call of ``name``."""
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            _stats[name] = [1, seconds, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+
+
+def timed(name):
+    """Decorator: time each call of the function as ``name``."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+class span:
+    """Context manager timing a block as ``name``."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.name, time.perf_counter() - self.start)
+
+
+def timed_iter(name, iterable):
+    """Time only the work done producing items from ``iterable`` (e.g. a
+    parser), not whatever the consumer does with them."""
+    if not enabled:
+        return iterable
+    return _timed_iter(name, iter(iterable))
+
+
+def _timed_iter(name, it):
+    clock = time.perf_counter
+    spent = 0.0
+    try:
+        while True:
+            start = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                spent += clock() - start
+                return
+            spent += clock() - start
+            yield item
+    finally:
+        record(name, spent)
+
+
+def stats():
+    """Counters as a list of dicts, most total time first."""
+    with _lock:
+        items = [(name, list(s)) for name, s in _stats.items()]
+    rows = [
+        {
+            'name': name,
+            'count': count,
+            'total_ms': total * 1e3,
+            'mean_ms': total * 1e3 / count,
+            'max_ms': peak * 1e3,
+        }
+        for name, (count, total, peak) in items
+    ]
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return rows
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def dump_stats(path):
+    """Write the counters to ``path`` as JSON."""
+    with open(path, 'w') as fh:
+        json.dump({'time': time.time(), 'stats': stats()}, fh, indent=2)
+
+
+# ----------------- cProfile -----------------
+# cProfile only sees the thread that starts it, so the GUI profiles its
+# main thread; background loads/saves show up in the counters instead.
+
+
+def profiling():
+    return _profiler is not None
+
+
+def start_profile():
+    global _profiler
+    if _profiler is None:
+        import cProfile
+
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_profile(path):
+    """Stop profiling and write pstats data to ``path`` (open it with
+    ``python -m pstats`` or snakeviz)."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return False
+    profiler.disable()
+    profiler.dump_stats(path)
+    return True
+
+
+# ----------------- Start-up -----------------
+# STARTUP_REPORT=1 prints how long the window took to first appear to
+# stderr; STARTUP_REPORT=exit also closes it straight away (used by
+# startup_bench.py). When the launcher puts its own perf_counter() in
+# STARTUP_T0 the report also counts interpreter start-up and imports.
+
+STARTUP_VAR = 'STARTUP_REPORT'
+
+
+def first_frame(window, started):
+    """Draw ``window`` now, before any data is loaded, and report the time
+    since ``started`` (a perf_counter() value) as 'startup.first_frame'.
+
+    Returns True when STARTUP_REPORT=exit asks the app to close.
+    """
+    window.update()
+    now = time.perf_counter()
+    if enabled:
+        record('startup.first_frame', now - started)
+    mode = os.environ.get(STARTUP_VAR, '')
+    if mode in ('', '0'):
+        return False
+    message = f'startup: first frame {(now - started) * 1e3:.1f} ms after main()'
+    launched = os.environ.get('STARTUP_T0')
+    if launched:
+        message += f', {(now - float(launched)) * 1e3:.1f} ms after launch'
+    print(message, file=sys.stderr, flush=True)
+    return mode == 'exit'
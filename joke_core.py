@@ -0,0 +1,348 @@
+"""Joke corpus for the Joke-Telling Assistant (no tkinter in here).
+
+Jokes live one per line in a text file, setup and punchline split on the
+first "?" (see randomJokes.txt). JokeCorpus never reads the whole file:
+it keeps a table of line start offsets in an index file next to the
+corpus (e.g. randomJokes.txt.idx), both files are mmap'd, and a joke is
+only decoded when it is asked for. The index is rebuilt automatically
+when the corpus file's size or mtime changes.
+
+ShuffleScheduler deals joke numbers in a shuffled order with no repeats
+until every joke has been told, using O(1) memory, and can save its place
+in a small JSON file so the order survives restarts.
+
+Prefetcher keeps the next few jokes ready on a background thread so the
+UI never waits on the corpus or the scheduler.
+
+JokeSession is the state one JokeAssistant window keeps (the joke on
+show and whether its punchline is out), for front ends without a window
+such as joke_server.py.
+"""
+import os
+import json
+import mmap
+import queue
+import random
+import struct
+import threading
+import time
+from array import array
+
+DEFAULT_JOKES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "Assessment 1 - Skills Portfolio", "A1 - Resources", "randomJokes.txt")
+
+INDEX_EXT = ".idx"
+# magic, version, corpus size, corpus mtime_ns, joke count (32 bytes, so
+# the uint64 offsets that follow stay 8-byte aligned)
+INDEX_HEADER = struct.Struct("<4sIQqQ")
+INDEX_MAGIC = b"JIDX"
+INDEX_VERSION = 1
+STATE_EXT = ".state"
+
+
+def parse_joke(line):
+    """Split a corpus line into (setup, punchline); setup keeps its "?"."""
+    line = line.strip()
+    mark = line.find("?")
+    if mark < 0:
+        return line, ""
+    return line[:mark + 1], line[mark + 1:].strip()
+
+
+def index_path(path):
+    return path + INDEX_EXT
+
+
+def build_offsets(path):
+    """Start offset of every non-blank line in ``path``, as array('Q')."""
+    offsets = array("Q")
+    pos = 0
+    with open(path, "rb") as fh:
+        for line in fh:
+            if line.strip():
+                offsets.append(pos)
+            pos += len(line)
+    return offsets
+
+
+def write_index(path, offsets, st):
+    """Save ``offsets`` for the corpus whose os.stat() is ``st``."""
+    idx = index_path(path)
+    tmp = idx + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, st.st_size,
+                                   st.st_mtime_ns, len(offsets)))
+        if offsets:
+            if struct.pack("=H", 1) != struct.pack("<H", 1):
+                offsets = array("Q", offsets)
+                offsets.byteswap()
+            fh.write(offsets.tobytes())
+    os.replace(tmp, idx)
+
+
+class JokeCorpus:
+    """Read-only sequence of (setup, punchline) tuples backed by a file.
+
+    ``len(corpus)`` and ``corpus[i]`` are O(1) and touch only the bytes of
+    joke i, so random.choice(corpus) works on corpora of any size.
+    """
+
+    def __init__(self, path=DEFAULT_JOKES_FILE):
+        self.path = path
+        self._data = None
+        self._index = None
+        self._offsets = array("Q")
+        st = os.stat(path)
+        self._size = st.st_size
+        if st.st_size:
+            with open(path, "rb") as fh:
+                self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            self._offsets = self._load_index(st)
+
+    def _load_index(self, st):
+        idx = index_path(self.path)
+        try:
+            with open(idx, "rb") as fh:
+                index = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            index = None
+        if index is not None:
+            if len(index) >= INDEX_HEADER.size:
+                magic, version, size, mtime, count = INDEX_HEADER.unpack_from(index)
+                fresh = (magic == INDEX_MAGIC and version == INDEX_VERSION
+                         and size == st.st_size and mtime == st.st_mtime_ns
+                         and len(index) == INDEX_HEADER.size + 8 * count)
+                if fresh and struct.pack("=H", 1) == struct.pack("<H", 1):
+                    self._index = index
+                    return memoryview(index)[INDEX_HEADER.size:].cast("Q")
+            index.close()
+        offsets = build_offsets(self.path)
+        try:
+            write_index(self.path, offsets, st)
+        except OSError:
+            # Read-only folder: keep the offsets in memory this time
+            pass
+        return offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self._offsets)
+        start = self._offsets[i]
+        end = self._data.find(b"\n", start)
+        if end < 0:
+            end = self._size
+        return parse_joke(self._data[start:end].decode("utf-8", "replace"))
+
+    def close(self):
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._offsets = array("Q")
+        for mapped in (self._index, self._data):
+            if mapped is not None:
+                mapped.close()
+        self._index = self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def state_path(path):
+    return path + STATE_EXT
+
+
+def save_state(state_file, state):
+    """Atomically write a ShuffleScheduler.state() dict to ``state_file``."""
+    tmp = state_file + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, state_file)
+
+
+class ShuffleScheduler:
+    """Visit 0..n-1 in a seeded pseudo-random order without repeats.
+
+    The k-th draw of a round is a keyed permutation of k: a four-round
+    Feistel network over the smallest even number of bits that holds n,
+    so its domain is less than 4n. A result >= n is put through the
+    network again ("cycle walking") until it lands below n, which keeps
+    the mapping a permutation of 0..n-1. Only the round keys and a
+    counter are kept, so memory does not depend on n. When a round is
+    used up a new one starts with different keys.
+    """
+
+    def __init__(self, n, seed=None, state_file=None):
+        self.n = n
+        self.seed = random.randrange(1 << 32) if seed is None else seed
+        self.state_file = state_file
+        self.round = 0
+        self.drawn = 0
+        self._start_round()
+
+    def _start_round(self):
+        self._half = (max(1, self.n - 1).bit_length() + 1) // 2
+        # String seeds hash the same way in every run
+        rng = random.Random(f"{self.seed}:{self.round}")
+        self._keys = [rng.getrandbits(32) for _ in range(4)]
+        self.drawn = 0
+
+    def _permute(self, x):
+        half = self._half
+        mask = (1 << half) - 1
+        left, right = x >> half, x & mask
+        for key in self._keys:
+            # Round function: a 32-bit multiply-xorshift hash of the right half
+            v = ((right ^ key) * 0x9E3779B1) & 0xFFFFFFFF
+            v ^= v >> 16
+            v = (v * 0x85EBCA6B) & 0xFFFFFFFF
+            v ^= v >> 13
+            left, right = right, left ^ (v & mask)
+        return (left << half) | right
+
+    @property
+    def remaining(self):
+        """Jokes left before the current round starts repeating."""
+        return self.n - self.drawn
+
+    def next(self):
+        if self.n <= 0:
+            raise IndexError("no jokes to schedule")
+        if self.drawn >= self.n:
+            self.round += 1
+            self._start_round()
+        value = self._permute(self.drawn)
+        while value >= self.n:
+            value = self._permute(value)
+        self.drawn += 1
+        return value
+
+    def state(self):
+        return {"version": 2, "n": self.n, "seed": self.seed,
+                "round": self.round, "drawn": self.drawn}
+
+    def save(self):
+        """Write the position to ``state_file`` (if any), atomically."""
+        if self.state_file:
+            save_state(self.state_file, self.state())
+
+    @classmethod
+    def load(cls, state_file, n):
+        """Resume from ``state_file``, or start afresh when it is missing,
+        unreadable or was saved for a corpus of a different size."""
+        try:
+            with open(state_file) as fh:
+                state = json.load(fh)
+            if state.get("version") != 2 or state["n"] != n:
+                raise ValueError("state is for another corpus")
+            sched = cls(n, state["seed"], state_file)
+            sched.round = state["round"]
+            sched._start_round()
+            sched.drawn = min(max(0, int(state["drawn"])), n)
+        except (OSError, ValueError, KeyError, TypeError):
+            sched = cls(n, state_file=state_file)
+        return sched
+
+
+class JokeSession:
+    """One audience: its own no-repeat order, current joke and whether the
+    punchline has been revealed (JokeAssistant.new_joke/reveal_punchline
+    without the widgets)."""
+
+    def __init__(self, corpus, scheduler=None):
+        self.corpus = corpus
+        self.scheduler = scheduler or ShuffleScheduler(len(corpus))
+        self.active = None
+        self.is_punchline_visible = False
+        self.last_used = time.monotonic()
+
+    def new_joke(self):
+        """Move on to the next joke; returns (id, setup)."""
+        self.active = self.scheduler.next()
+        self.is_punchline_visible = False
+        return self.active, self.corpus[self.active][0]
+
+    def reveal_punchline(self):
+        """Punchline of the current joke, or None before the first joke."""
+        if self.active is None:
+            return None
+        self.is_punchline_visible = True
+        return self.corpus[self.active][1]
+
+
+class Prefetcher:
+    """Keep up to ``depth`` results of ``produce()`` ready in a buffer.
+
+    A daemon thread calls ``produce()`` whenever the buffer has room, so
+    get() normally returns at once (a hit); when the buffer is empty it
+    waits for the worker (a miss). clear() throws away what is buffered,
+    e.g. after the caller changes what ``produce()`` should return.
+    """
+
+    def __init__(self, produce, depth=4):
+        self.produce = produce
+        self.depth = depth
+        self.hits = 0
+        self.misses = 0
+        self.wait_total = 0.0
+        self._queue = queue.Queue(maxsize=depth)
+        self._generation = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True,
+                                        name="joke-prefetch")
+        self._thread.start()
+
+    def _fill(self):
+        while not self._stop.is_set():
+            generation = self._generation
+            try:
+                item = (generation, self.produce(), None)
+            except Exception as ex:
+                item = (generation, None, ex)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def get(self):
+        """Next result of ``produce()``; re-raises what it raised."""
+        try:
+            generation, value, error = self._queue.get_nowait()
+            self.hits += 1
+        except queue.Empty:
+            self.misses += 1
+            start = time.perf_counter()
+            generation, value, error = self._queue.get()
+            self.wait_total += time.perf_counter() - start
+        while generation != self._generation:
+            # Produced before clear(); fetch a fresh one
+            generation, value, error = self._queue.get()
+        if error is not None:
+            raise error
+        return value
+
+    def clear(self):
+        self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        served = self.hits + self.misses
+        return {"depth": self.depth, "buffered": self._queue.qsize(),
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / served if served else None,
+                "mean_wait_ms": self.wait_total * 1e3 / self.misses if self.misses else 0.0}
+
+    def close(self):
+        self._stop.set()
+        self.clear()
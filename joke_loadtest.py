@@ -0,0 +1,115 @@
+"""Load test for joke_server.py over keep-alive connections.
+
+    python joke_loadtest.py --spawn                    # starts its own server
+    python joke_loadtest.py --port 8080 --clients 100 --requests 500
+
+Each simulated kiosk opens one connection, keeps its session cookie and
+alternates GET /joke and GET /punchline (every 10th request fetches a
+/jokes batch instead). Prints requests/sec and latency percentiles as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+
+async def kiosk(host, port, requests, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    cookie = ""
+    clock = time.perf_counter
+    try:
+        for n in range(requests):
+            if n % 10 == 9:
+                path = "/jokes?count=10"
+            else:
+                path = "/joke" if n % 2 == 0 else "/punchline"
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{cookie}\r\n"
+            start = clock()
+            writer.write(request.encode("latin-1"))
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head[9:12])
+            length = 0
+            for line in head.decode("latin-1").split("\r\n")[1:]:
+                name, _, value = line.partition(":")
+                name = name.lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "set-cookie":
+                    cookie = "Cookie: " + value.split(";")[0].strip() + "\r\n"
+            await reader.readexactly(length)
+            latencies.append(clock() - start)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def _percentile(values, p):
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+async def run(host, port, clients, requests):
+    latencies, errors = [], {}
+    start = time.perf_counter()
+    results = await asyncio.gather(*(kiosk(host, port, requests, latencies, errors)
+                                     for _ in range(clients)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failed = [repr(r) for r in results if isinstance(r, Exception)]
+    latencies.sort()
+    report = {"clients": clients, "requests": len(latencies), "seconds": round(elapsed, 3),
+              "requests_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+              "errors": errors, "failed_clients": failed[:5]}
+    if latencies:
+        report["latency_ms"] = {f"p{p}": round(_percentile(latencies, p) * 1e3, 3)
+                                for p in (50, 90, 99)}
+        report["latency_ms"]["max"] = round(latencies[-1] * 1e3, 3)
+    return report
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port):
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, os.path.join(here, "joke_server.py"),
+                             "--port", str(port)], stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()  # "Serving ..." once it is listening
+    return proc
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test joke_server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent kiosks")
+    parser.add_argument("--requests", type=int, default=200, help="requests per kiosk")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a server on a free port for the test")
+    args = parser.parse_args(argv)
+
+    proc = None
+    if args.spawn:
+        args.port = _free_port()
+        proc = spawn_server(args.port)
+    try:
+        report = asyncio.run(run(args.host, args.port, args.clients, args.requests))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps(report, indent=2))
+    return 1 if report["errors"] or report["failed_clients"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
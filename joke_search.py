@@ -0,0 +1,300 @@
+"""Keyword, prefix and "more like this" search over a joke corpus.
+
+JokeSearch is an inverted index: for every word, the sorted numbers of
+the jokes (setup and punchline) that contain it. It is saved next to the
+corpus (e.g. randomJokes.txt.search) and mmap'd when reopened, so a
+query reads only the posting lists of its own words and never rescans
+the corpus.
+
+Indexing is incremental. update() indexes the jokes after the last one
+already indexed, in batches if asked. When jokes are appended to the
+corpus file only the new ones are indexed; any other change to the file
+rebuilds the index.
+
+Results are (score, joke id) pairs, best first. A joke scores the sum of
+the idf weights of the query words it contains, scaled down a little for
+long jokes (BM25-style length normalisation).
+"""
+import os
+import re
+import math
+import mmap
+import heapq
+import bisect
+import struct
+import zlib
+from array import array
+from operator import itemgetter
+
+SEARCH_EXT = ".search"
+# magic, version, corpus size, corpus mtime_ns, crc32 of the whole corpus,
+# jokes indexed, term count, term blob bytes, postings count (64 bytes)
+HEADER = struct.Struct("<4sIQqIIQQQQ")
+MAGIC = b"JSRC"
+VERSION = 2
+CRC_CHUNK = 1 << 20  # bytes read at a time while checksumming the corpus
+MAX_EXPANSIONS = 200  # terms a prefix like "ch*" may expand to
+LENGTH_WEIGHT = 0.5  # 0 ignores joke length, 1 is full normalisation
+RESCORE_POOL = 20  # raw-score candidates per result re-ranked by length
+COMMON_SHARE = 0.05  # "more like this" ignores words in more of the jokes,
+COMMON_MIN_DOCS = 1000  # ... once they are in more jokes than this
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by do does did for from get got had has have he her "
+    "his i if in into is it its me my no not of on one or our she so than that the "
+    "their them then there they this to too up was we were what when where which "
+    "who why will with you your".split())
+
+
+def tokenize(text):
+    """Lower-case words of ``text`` minus stopwords, apostrophes dropped."""
+    text = text.lower().replace("’", "'")
+    return [w.replace("'", "") for w in TOKEN_RE.findall(text)
+            if w not in STOPWORDS and len(w) > 1]
+
+
+def search_path(corpus_path):
+    return corpus_path + SEARCH_EXT
+
+
+def _crc(path, start, stop, crc=0):
+    """crc32 of bytes ``start`` to ``stop`` of ``path``, carrying on from
+    ``crc`` (the crc32 of the bytes before ``start``)."""
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        left = stop - start
+        while left > 0:
+            chunk = fh.read(min(left, CRC_CHUNK))
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            left -= len(chunk)
+    return crc
+
+
+def _pad8(n):
+    return -n % 8
+
+
+class JokeSearch:
+    """Inverted index over a JokeCorpus; see the module docstring."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.docs = 0
+        self._map = None
+        self._terms = []
+        self._starts = array("Q", [0])
+        self._postings = array("I")
+        self._lengths = array("H")
+        self._total_length = 0
+        # Jokes indexed since the file was written
+        self._new = {}
+        self._new_lengths = array("H")
+        self._new_terms = None
+        # (corpus size, crc32 of that much of it) as checked by _load, so
+        # save() only has to checksum what was appended since
+        self._checked = (0, 0)
+
+    # ---------- opening and saving ----------
+    @classmethod
+    def open(cls, corpus):
+        """Index for ``corpus`` from its .search file when that still
+        matches; call update() (and save()) to index anything new."""
+        index = cls(search_path(corpus.path))
+        try:
+            st = os.stat(corpus.path)
+            index._load(st, corpus)
+        except (OSError, ValueError, struct.error):
+            index = cls(search_path(corpus.path))
+        return index
+
+    def _load(self, st, corpus):
+        with open(self.path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, size, mtime, crc, docs, nterms, blob_len,
+         npostings, _) = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION or docs > len(corpus):
+            mapped.close()
+            raise ValueError("stale search index")
+        # An append leaves every byte indexed so far as it was
+        same = size == st.st_size and mtime == st.st_mtime_ns
+        if not same and (st.st_size <= size or _crc(corpus.path, 0, size) != crc):
+            mapped.close()
+            raise ValueError("corpus was edited, not appended to")
+        view = memoryview(mapped)
+        pos = HEADER.size
+        self._lengths = view[pos:pos + 2 * docs].cast("H")
+        pos += 2 * docs + _pad8(2 * docs)
+        blob = bytes(view[pos:pos + blob_len])
+        self._terms = blob.decode("utf-8").split("\n") if nterms else []
+        pos += blob_len + _pad8(blob_len)
+        self._starts = view[pos:pos + 8 * (nterms + 1)].cast("Q")
+        pos += 8 * (nterms + 1)
+        self._postings = view[pos:pos + 4 * npostings].cast("I")
+        self._map = mapped
+        self.docs = docs
+        self._total_length = sum(self._lengths)
+        self._checked = (size, crc)
+
+    def save(self, corpus):
+        """Write everything indexed so far to the .search file."""
+        terms = sorted(set(self._terms).union(self._new))
+        starts = array("Q", [0])
+        postings = array("I")
+        for term in terms:
+            postings.extend(self.postings(term))
+            starts.append(len(postings))
+        lengths = array("H", self._lengths)
+        lengths.extend(self._new_lengths)
+        blob = "\n".join(terms).encode("utf-8")
+        st = os.stat(corpus.path)
+        size, crc = self._checked
+        if st.st_size < size:
+            size, crc = 0, 0
+        crc = _crc(corpus.path, size, st.st_size, crc)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(HEADER.pack(MAGIC, VERSION, st.st_size, st.st_mtime_ns, crc, self.docs,
+                                 len(terms), len(blob), len(postings), 0))
+            for part in (lengths.tobytes(), blob):
+                fh.write(part)
+                fh.write(bytes(_pad8(len(part))))
+            fh.write(starts.tobytes())
+            fh.write(postings.tobytes())
+        self.close()
+        os.replace(tmp, self.path)
+        self._load(st, corpus)
+
+    def close(self):
+        for view in (self._lengths, self._starts, self._postings):
+            if isinstance(view, memoryview):
+                view.release()
+        if self._map is not None:
+            self._map.close()
+        self.__init__(self.path)
+
+    # ---------- indexing ----------
+    def update(self, corpus, batch=None):
+        """Index up to ``batch`` jokes not yet indexed (all by default);
+        returns how many are still left."""
+        end = len(corpus) if batch is None else min(len(corpus), self.docs + batch)
+        new = self._new
+        for doc in range(self.docs, end):
+            setup, punchline = corpus[doc]
+            words = tokenize(setup + " " + punchline)
+            self._new_lengths.append(min(len(words), 0xFFFF))
+            self._total_length += self._new_lengths[-1]
+            for word in set(words):
+                posting = new.get(word)
+                if posting is None:
+                    new[word] = posting = array("I")
+                posting.append(doc)
+        if end > self.docs:
+            self.docs = end
+            self._new_terms = None
+        return len(corpus) - self.docs
+
+    @property
+    def dirty(self):
+        """True when there are indexed jokes not yet saved."""
+        return bool(self._new_lengths)
+
+    # ---------- lookups ----------
+    def postings(self, term):
+        """Sorted joke numbers containing ``term``."""
+        found = array("I")
+        i = bisect.bisect_left(self._terms, term)
+        if i < len(self._terms) and self._terms[i] == term:
+            found.frombytes(self._postings[self._starts[i]:self._starts[i + 1]].tobytes())
+        extra = self._new.get(term)
+        if extra:
+            found.extend(extra)
+        return found
+
+    def df(self, term):
+        """Number of jokes containing ``term``."""
+        count = len(self._new.get(term, ()))
+        i = bisect.bisect_left(self._terms, term)
+        if i < len(self._terms) and self._terms[i] == term:
+            count += self._starts[i + 1] - self._starts[i]
+        return count
+
+    def _length(self, doc):
+        base = len(self._lengths)
+        return self._lengths[doc] if doc < base else self._new_lengths[doc - base]
+
+    def expand(self, prefix, limit=MAX_EXPANSIONS):
+        """Indexed terms starting with ``prefix``."""
+        if self._new_terms is None:
+            self._new_terms = sorted(self._new)
+        found = set()
+        for terms in (self._terms, self._new_terms):
+            i = bisect.bisect_left(terms, prefix)
+            while i < len(terms) and terms[i].startswith(prefix) and len(found) < limit:
+                found.add(terms[i])
+                i += 1
+        return sorted(found)
+
+    def idf(self, df):
+        return math.log(1 + (self.docs - df + 0.5) / (df + 0.5))
+
+    def _rank(self, weighted_terms, limit, exclude=None):
+        scores = {}
+        get = scores.get
+        for term, boost in weighted_terms:
+            docs = self.postings(term)
+            if not docs:
+                continue
+            weight = self.idf(len(docs)) * boost
+            for doc in docs:
+                scores[doc] = get(doc, 0.0) + weight
+        if exclude is not None:
+            scores.pop(exclude, None)
+        if not scores:
+            return []
+        average = self._total_length / self.docs if self.docs else 1.0
+        length = self._length
+
+        def score(item):
+            doc, s = item
+            return s / (1 - LENGTH_WEIGHT + LENGTH_WEIGHT * length(doc) / (average or 1)), -doc
+
+        # Length only nudges the order, so it is applied to the best raw
+        # scores rather than to every match of a common word
+        pool = heapq.nlargest(limit * RESCORE_POOL, scores.items(), key=itemgetter(1))
+        best = heapq.nlargest(limit, pool, key=score)
+        return [(round(score(item)[0], 4), item[0]) for item in best]
+
+    def search(self, query, limit=10, prefix=False):
+        """Jokes matching any word of ``query``, best first.
+
+        A word ending in "*" matches every word with that prefix; with
+        ``prefix=True`` the last word does too (for type-ahead boxes).
+        """
+        words = query.lower().replace("’", "'").split()
+        if prefix and words and not words[-1].endswith("*"):
+            words[-1] += "*"
+        weighted = []
+        for word in words:
+            if word.endswith("*"):
+                stem = "".join(tokenize(word[:-1]) or [word[:-1].replace("'", "")])
+                if stem:
+                    # Each expansion counts a bit less than an exact word
+                    weighted.extend((term, 1.0 if term == stem else 0.8)
+                                    for term in self.expand(stem))
+            else:
+                weighted.extend((term, 1.0) for term in tokenize(word))
+        return self._rank(weighted, limit)
+
+    def more_like_this(self, corpus, doc, limit=10, max_terms=12):
+        """Jokes sharing the most distinctive words of joke ``doc``."""
+        setup, punchline = corpus[doc]
+        terms = set(tokenize(setup + " " + punchline))
+        # Rarest words say most about what a joke is about; words in a
+        # large share of all jokes say almost nothing and cost the most
+        by_rarity = sorted((self.df(t), t) for t in terms)
+        common = max(self.docs * COMMON_SHARE, COMMON_MIN_DOCS)
+        picked = [t for df, t in by_rarity if df <= common] or [t for _, t in by_rarity[:1]]
+        return self._rank([(t, 1.0) for t in picked[:max_terms]], limit, exclude=doc)
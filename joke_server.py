@@ -0,0 +1,187 @@
+"""Serve jokes over HTTP/JSON to several kiosks (asyncio, stdlib only).
+
+    python joke_server.py --port 8080 [--jokes randomJokes.txt]
+
+Endpoints (GET, JSON responses):
+    /joke             next joke for this client: {"id", "setup"}
+    /punchline        punchline of this client's current joke
+    /joke/<id>        setup and punchline of joke <id>
+    /jokes?count=N    N random jokes with punchlines (N <= MAX_BATCH)
+    /search?q=words   ranked matches; "ch*" matches prefixes, &prefix=1
+                      treats the last word as one, &limit=N (<= MAX_BATCH)
+    /joke/<id>/similar  jokes most like joke <id>, ranked
+    /stats            request, connection and session counters
+
+Clients are told apart by a "session" cookie set on their first response.
+Each session deals jokes without repeats like the desktop app and keeps
+its own punchline state. Connections stay open between requests
+(HTTP/1.1 keep-alive, see json_http.py) until the client closes them or
+is idle for KEEPALIVE_TIMEOUT seconds. joke_loadtest.py measures
+throughput.
+"""
+import argparse
+import asyncio
+import collections
+import random
+import secrets
+import time
+from urllib.parse import parse_qs
+
+from joke_core import DEFAULT_JOKES_FILE, JokeCorpus, JokeSession
+from joke_search import JokeSearch
+from json_http import MAX_HEADER_BYTES, HttpError, JsonHttpServer
+
+SESSION_TTL = 30 * 60  # seconds before an unused session is dropped
+MAX_SESSIONS = 10000  # oldest sessions are dropped beyond this
+MAX_BATCH = 1000
+# Only these endpoints depend on who is asking
+SESSION_PATHS = ("/joke", "/punchline")
+
+
+class JokeServer(JsonHttpServer):
+    def __init__(self, corpus, search=None):
+        super().__init__()
+        self.corpus = corpus
+        self.search = search
+        self.sessions = collections.OrderedDict()
+        self.started = time.monotonic()
+
+    # ---------- sessions ----------
+    def session_for(self, token):
+        """Return (token, session, is_new) for a cookie value or None."""
+        now = time.monotonic()
+        # Sessions are kept in least-recently-used order, so expired
+        # ones are always at the front
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if now - oldest.last_used < SESSION_TTL and len(self.sessions) < MAX_SESSIONS:
+                break
+            self.sessions.popitem(last=False)
+        session = self.sessions.get(token) if token else None
+        is_new = session is None
+        if is_new:
+            token = secrets.token_urlsafe(12)
+            session = JokeSession(self.corpus)
+            self.sessions[token] = session
+        else:
+            self.sessions.move_to_end(token)
+        session.last_used = now
+        return token, session, is_new
+
+    # ---------- endpoints ----------
+    def joke_json(self, index):
+        setup, punchline = self.corpus[index]
+        return {"id": index, "setup": setup, "punchline": punchline}
+
+    def ranked(self, hits):
+        return {"results": [dict(self.joke_json(index), score=score) for score, index in hits]}
+
+    def _limit(self, query):
+        try:
+            return max(0, min(int(query.get("limit", ["10"])[0]), MAX_BATCH))
+        except ValueError:
+            raise HttpError(400, "limit must be a number")
+
+    def _require_jokes(self):
+        if not len(self.corpus):
+            raise HttpError(503, "no jokes loaded")
+
+    def route(self, path, query, session):
+        if path == "/joke":
+            self._require_jokes()
+            index, setup = session.new_joke()
+            return {"id": index, "setup": setup}
+        if path == "/punchline":
+            punchline = session.reveal_punchline()
+            if punchline is None:
+                raise HttpError(404, "no joke told yet; GET /joke first")
+            return {"id": session.active, "punchline": punchline}
+        if path == "/search":
+            words = query.get("q", [""])[0]
+            prefix = query.get("prefix", ["0"])[0] not in ("", "0")
+            return self.ranked(self.search.search(words, self._limit(query), prefix))
+        if path.startswith("/joke/"):
+            ident, _, action = path[len("/joke/"):].partition("/")
+            try:
+                index = int(ident)
+            except ValueError:
+                raise HttpError(400, "joke id must be a number")
+            if not 0 <= index < len(self.corpus):
+                raise HttpError(404, f"no joke {index}")
+            if action == "similar":
+                hits = self.search.more_like_this(self.corpus, index, self._limit(query))
+                return self.ranked(hits)
+            if action:
+                raise HttpError(404, f"unknown path {path}")
+            return self.joke_json(index)
+        if path == "/jokes":
+            try:
+                count = int(query.get("count", ["10"])[0])
+            except ValueError:
+                raise HttpError(400, "count must be a number")
+            self._require_jokes()
+            count = max(0, min(count, MAX_BATCH))
+            n = len(self.corpus)
+            return {"jokes": [self.joke_json(random.randrange(n)) for _ in range(count)]}
+        if path == "/stats":
+            return {"jokes": len(self.corpus), "requests": self.requests,
+                    "connections": self.connections,
+                    "open_connections": self.open_connections,
+                    "sessions": len(self.sessions),
+                    "uptime_s": round(time.monotonic() - self.started, 1)}
+        raise HttpError(404, f"unknown path {path}")
+
+    # ---------- HTTP ----------
+    def request(self, method, url, headers, body, reply_headers):
+        session = None
+        if url.path in SESSION_PATHS:
+            token, session, is_new = self.session_for(_cookie(headers.get("cookie", ""), "session"))
+            if is_new:
+                reply_headers.append(f"Set-Cookie: session={token}; Path=/; HttpOnly")
+        if method != "GET":
+            raise HttpError(405, "only GET is supported")
+        return 200, self.route(url.path, parse_qs(url.query), session)
+
+
+def _cookie(header, name):
+    for part in header.split(";"):
+        key, _, value = part.strip().partition("=")
+        if key == name:
+            return value
+    return None
+
+
+async def serve(host="127.0.0.1", port=8080, jokes_file=DEFAULT_JOKES_FILE, ready=None):
+    with JokeCorpus(jokes_file) as corpus:
+        # Indexes only jokes added since the index was last saved
+        search = JokeSearch.open(corpus)
+        search.update(corpus)
+        if search.dirty:
+            try:
+                search.save(corpus)
+            except OSError:
+                pass
+        server = JokeServer(corpus, search)
+        listener = await asyncio.start_server(server.handle, host, port, limit=MAX_HEADER_BYTES)
+        addresses = ", ".join(str(sock.getsockname()) for sock in listener.sockets)
+        print(f"Serving {len(corpus)} jokes on {addresses}", flush=True)
+        if ready is not None:
+            ready.set()
+        async with listener:
+            await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON joke server for kiosks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--jokes", default=DEFAULT_JOKES_FILE, help="corpus file")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.jokes))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""HTTP/1.1 plumbing shared by joke_server.py and quiz_server.py (asyncio,
+stdlib only).
+
+JsonHttpServer reads requests off keep-alive connections, hands each one
+to its subclass's request() and writes the returned body as JSON. An
+HttpError becomes an error response with its status; any other exception
+is printed and answered with a 500, so a bug in one endpoint never drops
+the client's connection.
+"""
+import asyncio
+import json
+import traceback
+from urllib.parse import urlsplit
+
+KEEPALIVE_TIMEOUT = 15  # seconds an idle connection is kept open
+MAX_HEADER_BYTES = 16 * 1024
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class JsonHttpServer:
+    """Base for the servers: counts requests and connections and answers
+    each request with request(method, url, headers, body, reply_headers),
+    which returns (status, JSON-able body). It may add "Name: value"
+    lines to reply_headers; they are sent with errors too."""
+
+    max_body = MAX_HEADER_BYTES  # larger request bodies get a 413
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.open_connections = 0
+
+    def request(self, method, url, headers, body, reply_headers):
+        raise NotImplementedError
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.open_connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    return
+                keep_alive = await self.respond(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+    async def respond(self, head, reader, writer):
+        """Answer one request; returns whether to keep the connection."""
+        self.requests += 1
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            self.send(writer, 400, {"error": "bad request line"}, False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            self.send(writer, 400, {"error": "bad Content-Length"}, False)
+            return False
+        if length > self.max_body:
+            self.send(writer, 413, {"error": "body too large"}, False)
+            return False
+        raw = await reader.readexactly(length) if length else b""
+
+        reply_headers = []
+        try:
+            status, body = self.request(method, urlsplit(target), headers, raw,
+                                        reply_headers)
+        except HttpError as ex:
+            status, body = ex.status, {"error": str(ex)}
+        except Exception:
+            traceback.print_exc()
+            status, body = 500, {"error": "internal server error"}
+        self.send(writer, status, body, keep_alive, reply_headers)
+        return keep_alive
+
+    def send(self, writer, status, body, keep_alive, extra_headers=()):
+        payload = json.dumps(body).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {REASONS[status]}",
+                "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(payload)}",
+                "Connection: " + ("keep-alive" if keep_alive else "close")]
+        if keep_alive:
+            head.append(f"Keep-Alive: timeout={KEEPALIVE_TIMEOUT}")
+        head.extend(extra_headers)
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
@@ -0,0 +1,194 @@
+"""Start-up benchmark for the three portfolio apps.
+
+    python startup_bench.py                      # all apps, 5 runs each
+    python startup_bench.py --runs 10 -o after.json
+    python startup_bench.py --compare before.json
+
+Each app is launched with ``python -X importtime`` and STARTUP_REPORT=exit,
+so it prints the time to its first frame and closes at once (see the
+first_frame() helpers in the apps). For every app the report gives the
+median over --runs of:
+
+    first_frame_ms     launch to first frame (interpreter, imports, window)
+    main_to_frame_ms   main() to first frame (window and widgets only)
+    imports_ms         time in the app's own imports (interpreter start-up
+                       imports such as site are left out)
+    wall_ms            launch to exit
+
+and the slowest top-level imports. Without a display the apps cannot open
+a window: first frame times are then null and an "error" is given, but the
+import breakdown is still measured. One untimed warm-up run per app lets
+Python cache bytecode first; "bytecode_cached" in the report is false when
+PYTHONDONTWRITEBYTECODE or -B stops it, and then imports include compiling.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESOURCES = os.path.join(HERE, "Assessment 1 - Skills Portfolio", "A1 - Resources")
+# name: command line after "python -X importtime"
+APPS = {
+    "quiz": [os.path.join(RESOURCES, "Excersize 1")],
+    "jokes": [os.path.join(HERE, "Exersise 2.py")],
+    "marks": [os.path.join(HERE, "exercise 3", "StudentManager.py")],
+    "marks-cli": [os.path.join(HERE, "exercise 3", "marks_cli.py"), "--help"],
+}
+TOP_IMPORTS = 8
+IMPORT_RE = re.compile(r"import time:\s*(\d+) \|\s*(\d+) \| ( *)(\S+)")
+FRAME_RE = re.compile(r"startup: first frame ([\d.]+) ms after main\(\)"
+                      r"(?:, ([\d.]+) ms after launch)?")
+
+
+def log(*args):
+    print(*args, file=sys.stderr)
+
+
+def parse_imports(stderr):
+    """Top-level imports as {module: (self_us, cumulative_us)}."""
+    found = {}
+    for line in stderr.splitlines():
+        m = IMPORT_RE.match(line)
+        if m and not m.group(3):
+            found[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+    return found
+
+
+def interpreter_imports():
+    """Modules every interpreter imports before running anything."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                          capture_output=True, text=True)
+    return set(parse_imports(proc.stderr))
+
+
+def launch(command):
+    env = dict(os.environ, STARTUP_REPORT="exit")
+    env["STARTUP_T0"] = repr(time.perf_counter())
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + command,
+                          capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(command[0]), timeout=120)
+    wall = time.perf_counter() - start
+    return proc, wall
+
+
+def measure(name, command, runs, skip):
+    launch(command)  # warm-up: lets Python write bytecode
+    frames, mains, walls, imports = [], [], [], []
+    per_module = {}
+    error = None
+    for _ in range(runs):
+        proc, wall = launch(command)
+        walls.append(wall * 1e3)
+        found = {mod: t for mod, t in parse_imports(proc.stderr).items() if mod not in skip}
+        imports.append(sum(cum for _, cum in found.values()) / 1e3)
+        for mod, (own, cum) in found.items():
+            per_module.setdefault(mod, []).append((own / 1e3, cum / 1e3))
+        m = FRAME_RE.search(proc.stderr)
+        if m:
+            mains.append(float(m.group(1)))
+            if m.group(2):
+                frames.append(float(m.group(2)))
+        elif proc.returncode and error is None:
+            lines = [line for line in proc.stderr.splitlines()
+                     if not line.startswith("import time:")]
+            error = lines[-1] if lines else f"exit status {proc.returncode}"
+
+    def median(values):
+        return round(statistics.median(values), 2) if values else None
+
+    slowest = sorted(per_module.items(), key=lambda item: -statistics.median(c for _, c in item[1]))
+    result = {"first_frame_ms": median(frames), "main_to_frame_ms": median(mains),
+              "imports_ms": median(imports), "wall_ms": median(walls),
+              "top_imports": [{"module": mod,
+                               "self_ms": median([s for s, _ in times]),
+                               "cumulative_ms": median([c for _, c in times])}
+                              for mod, times in slowest[:TOP_IMPORTS]]}
+    if error:
+        result["error"] = error
+    log(f"{name:<10} first frame {_ms(result['first_frame_ms'])}  "
+        f"imports {_ms(result['imports_ms'])}  wall {_ms(result['wall_ms'])}"
+        + (f"  ({error})" if error else ""))
+    return result
+
+
+def _ms(value):
+    return f"{value:8.1f}ms" if value is not None else "       -  "
+
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(apps, runs):
+    skip = interpreter_imports()
+    report = {"meta": {"commit": _commit(), "python": platform.python_version(),
+                       "platform": platform.platform(), "runs": runs,
+                       "bytecode_cached": not (sys.flags.dont_write_bytecode
+                                               or os.environ.get("PYTHONDONTWRITEBYTECODE"))},
+              "apps": {}}
+    for name in apps:
+        report["apps"][name] = measure(name, APPS[name], runs, skip)
+    return report
+
+
+def compare(base, current, threshold):
+    """Print changes against ``base``; return the regressions."""
+    regressions = []
+    log(f"{'app':<10} {'measure':<16}{'before':>11}{'after':>11}{'change':>9}")
+    for name, result in current["apps"].items():
+        old = base.get("apps", {}).get(name)
+        if old is None:
+            continue
+        for key in ("first_frame_ms", "imports_ms"):
+            t0, t1 = old.get(key), result.get(key)
+            if t0 is None or t1 is None:
+                continue
+            change = (t1 - t0) / t0 if t0 else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, key))
+            log(f"{name:<10} {key:<16}{t0:>9.1f}ms{t1:>9.1f}ms{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure start-up time of the apps.")
+    parser.add_argument("apps", nargs="*", choices=[[]] + list(APPS),
+                        help="apps to measure (default: all)")
+    parser.add_argument("--runs", type=int, default=5, help="timed launches per app")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="slowdown that counts as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    report = run(args.apps or list(APPS), max(1, args.runs))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as fh:
+            base = json.load(fh)
+        if compare(base, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())